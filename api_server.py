@@ -0,0 +1,413 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+from metrics import METRICS
+from phi_masking import PHIMasker
+from triage import TRIAGE_URGENCY, emergency_triage
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_HEADER_LINES = 100
+KEEP_ALIVE_TIMEOUT = 15.0
+MAX_BULK_RECORDS = 10_000
+
+class HTTPError(Exception):
+    """Raised by handlers to return an error status with a JSON message"""
+    
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+# Masking in a process pool needs a picklable, module-level function
+_process_masker = None
+
+def _mask_texts(texts):
+    global _process_masker
+    if _process_masker is None:
+        _process_masker = PHIMasker()
+    return [_process_masker.mask_phi(text) for text in texts]
+
+class EmbeddingBatcher:
+    """Coalesces concurrent /embed calls into one ``batch_generate_embeddings`` call.
+    
+    Requests wait at most ``max_wait`` seconds for company; a full batch is sent
+    immediately. Each batch runs on the executor so the event loop stays free.
+    """
+    
+    def __init__(self, embedder, executor, max_batch=64, max_wait=0.005):
+        self.embedder = embedder
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = []
+        self._flush_handle = None
+    
+    async def embed(self, texts):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        if sum(len(pending_texts) for pending_texts, _ in self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+    
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+    
+    async def _run(self, batch):
+        texts = [text for pending_texts, _ in batch for text in pending_texts]
+        loop = asyncio.get_running_loop()
+        try:
+            embeddings = await loop.run_in_executor(
+                self.executor, self.embedder.batch_generate_embeddings, texts
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        METRICS.increment("embed_batches_total")
+        METRICS.increment("embed_batched_texts_total", len(texts))
+        start = 0
+        for pending_texts, future in batch:
+            if not future.done():
+                future.set_result(embeddings[start:start + len(pending_texts)])
+            start += len(pending_texts)
+
+class MedSecureAPI:
+    """Headless HTTP API over the masking, embedding, triage and storage components.
+    
+    Endpoints (JSON in, JSON out):
+        POST /mask     {"text": str} or {"texts": [str]}
+        POST /embed    {"text": str} or {"texts": [str]}      masked before embedding
+        POST /records  {"records": [{"text": str, "metadata": {}}]}
+                       -> {"ids", "stored", "duplicates": [[index, canonical_id]]}
+        POST /search   {"query": str, "top_k": int}
+        GET  /health   GET /metrics (Prometheus text)
+    
+    At most ``max_in_flight`` requests are processed at once; beyond that the
+    server sheds load with 503 + Retry-After instead of queueing without bound.
+    """
+    
+    def __init__(self, masker, embedder, db, max_in_flight=64, workers=None, mask_processes=0,
+                 embed_batch_size=64, embed_batch_wait=0.005):
+        self.masker = masker
+        self.embedder = embedder
+        self.db = db
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4),
+                                           thread_name_prefix="medsecure-api")
+        self.mask_executor = ProcessPoolExecutor(mask_processes) if mask_processes else None
+        self.batcher = (EmbeddingBatcher(embedder, self.executor, embed_batch_size, embed_batch_wait)
+                        if embedder is not None else None)
+        self.routes = {
+            ("POST", "/mask"): self.mask,
+            ("POST", "/embed"): self.embed,
+            ("POST", "/records"): self.add_records,
+            ("POST", "/search"): self.search,
+            ("GET", "/health"): self.health,
+        }
+    
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.mask_executor is not None:
+            self.mask_executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
+    async def _mask(self, texts):
+        if self.mask_executor is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.mask_executor, _mask_texts, texts)
+        return await self._run(lambda: [self.masker.mask_phi(text) for text in texts])
+    
+    # ------------------------------------------------------------------
+    # Request dispatch
+    # ------------------------------------------------------------------
+    async def dispatch(self, method, path, body):
+        """Route one request. Returns (status, payload); payload is JSON-able or str."""
+        path = path.split("?", 1)[0]
+        if method == "GET" and path == "/metrics":
+            return HTTPStatus.OK, METRICS.export_prometheus()
+        
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+        
+        if self.in_flight >= self.max_in_flight:
+            METRICS.increment("api_requests_shed_total", path=path)
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, retry shortly",
+                            {"Retry-After": "1"})
+        self.in_flight += 1
+        try:
+            payload = {}
+            if method == "POST":
+                try:
+                    payload = json.loads(body or b"{}")
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+                if not isinstance(payload, dict):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+            with METRICS.span(f"api{path.replace('/', '_')}"):
+                return HTTPStatus.OK, await handler(payload)
+        finally:
+            self.in_flight -= 1
+    
+    # ------------------------------------------------------------------
+    # Handlers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _texts(payload, single="text", many="texts"):
+        if single in payload:
+            texts = [payload[single]]
+        elif many in payload:
+            texts = payload[many]
+        else:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Provide '{single}' or '{many}'")
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{many}' must be a list of strings")
+        return texts
+    
+    async def mask(self, payload):
+        texts = self._texts(payload)
+        masked = await self._mask(texts)
+        return {"masked": masked[0]} if "text" in payload else {"masked": masked}
+    
+    async def embed(self, payload):
+        if self.batcher is None:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Embedding model is not loaded")
+        texts = self._texts(payload)
+        # Never embed raw PHI
+        embeddings = await self.batcher.embed(await self._mask(texts))
+        return {"embedding": embeddings[0]} if "text" in payload else {"embeddings": embeddings}
+    
+    async def add_records(self, payload):
+        records = payload.get("records")
+        if not isinstance(records, list) or not records:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'records' must be a non-empty list")
+        if len(records) > MAX_BULK_RECORDS:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                            f"At most {MAX_BULK_RECORDS} records per request")
+        for record in records:
+            if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Each record needs a 'text' string")
+            if not isinstance(record.get("metadata", {}), dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'metadata' must be an object")
+        
+        texts = [record["text"] for record in records]
+        masked = await self._mask(texts)
+        
+        def store():
+            ids, duplicates = [], []
+            for index, (record, masked_text) in enumerate(zip(records, masked)):
+                metadata = dict(record.get("metadata") or {})
+                metadata.pop("original_text", None)  # raw PHI never reaches the store
+                if "urgency" not in metadata:
+                    metadata["urgency"] = TRIAGE_URGENCY[emergency_triage(record["text"])["color"]]
+                record_id, stored = self.db.ingest_medical_record(masked_text, metadata)
+                ids.append(record_id)
+                if not stored:
+                    duplicates.append([index, record_id])
+            return ids, duplicates
+        
+        # ``ids`` has one entry per input record; skipped near-duplicates map to their canonical ID
+        ids, duplicates = await self._run(store)
+        return {"ids": ids, "stored": len(ids) - len(duplicates), "duplicates": duplicates}
+    
+    async def search(self, payload):
+        query = payload.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'query' must be a non-empty string")
+        top_k = payload.get("top_k", 5)
+        if not isinstance(top_k, int) or not 1 <= top_k <= 100:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'top_k' must be an integer between 1 and 100")
+        
+        masked_query = (await self._mask([query]))[0]
+        triage = emergency_triage(query)
+        results = await self._run(self.db.search_similar_cases, masked_query, top_k)
+        return {
+            "triage": triage,
+            "results": [
+                {"text": document, "metadata": metadata}
+                for document, metadata in zip(results["documents"][0], results["metadatas"][0])
+            ]
+        }
+    
+    async def health(self, payload):
+        return {
+            "status": "ok",
+            "in_flight": self.in_flight,
+            "embedder_loaded": self.embedder is not None,
+            "database": self.db.get_collection_info()
+        }
+    
+    # ------------------------------------------------------------------
+    # HTTP/1.1 connection handling
+    # ------------------------------------------------------------------
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one keep-alive connection until the client closes or idles out"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except HTTPError as e:
+                    await _write_response(writer, e.status, {"error": e.message}, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                
+                method, path, version, headers, body = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+                
+                started = time.perf_counter()
+                extra_headers = {}
+                try:
+                    status, payload = await self.dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload, extra_headers = e.status, {"error": e.message}, e.headers
+                except Exception:
+                    logger.exception("Unhandled error serving %s %s", method, path)
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+                METRICS.increment("api_requests_total", status=int(status))
+                await _write_response(writer, status, payload, keep_alive, extra_headers)
+                logger.debug("%s %s -> %d in %.1f ms", method, path, status,
+                             (time.perf_counter() - started) * 1000)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+async def _read_line(reader, status, message):
+    """One CRLF-terminated line, rejected with ``status`` if it exceeds the stream limit"""
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        raise HTTPError(status, message)
+
+async def _read_request(reader):
+    """Parse one HTTP/1.1 request. Returns None on a clean close between requests."""
+    request_line = await _read_line(reader, HTTPStatus.REQUEST_URI_TOO_LONG, "Request line too long")
+    if not request_line:
+        return None
+    try:
+        method, path, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await _read_line(reader, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Header line too long")
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+    
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Chunked bodies are not supported; send Content-Length")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, version.upper(), headers, body
+
+async def _write_response(writer, status, payload, keep_alive=True, extra_headers=None):
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+    status = HTTPStatus(status)
+    headers = {
+        "Content-Type": content_type,
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close",
+        **(extra_headers or {})
+    }
+    head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+    await writer.drain()
+
+async def serve(api, host="127.0.0.1", port=8080, backlog=1024):
+    """Run the API until cancelled"""
+    server = await asyncio.start_server(api.handle_connection, host, port, backlog=backlog)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"✅ MedSecure API listening on {addresses}")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MedSecure AI headless HTTP API")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: local only)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-in-flight", type=int, default=64,
+                        help="Requests processed at once before shedding load with 503")
+    parser.add_argument("--workers", type=int, help="Executor threads for CPU-bound work")
+    parser.add_argument("--mask-processes", type=int, default=0,
+                        help="Mask PHI in this many worker processes (0 = use the thread pool)")
+    parser.add_argument("--embed-batch-size", type=int, default=64)
+    parser.add_argument("--embed-batch-wait-ms", type=float, default=5.0)
+    parser.add_argument("--no-embedder", action="store_true", help="Skip loading the embedding model")
+    parser.add_argument("--dedup", choices=["off", "skip", "link"], default="off",
+                        help="Drop near-duplicate records on ingest, or store them linked to the original")
+    parser.add_argument("--dedup-threshold", type=float, default=0.85,
+                        help="Estimated Jaccard similarity at which a record counts as a near-duplicate")
+    args = parser.parse_args(argv)
+    
+    from cyborgdb_client import MedicalVectorDB
+    
+    embedder = None
+    if not args.no_embedder:
+        from embeddings import MedicalEmbedder
+        embedder = MedicalEmbedder()
+    db = MedicalVectorDB(dedup=None if args.dedup == "off" else args.dedup, dedup_threshold=args.dedup_threshold)
+    METRICS.register_gauge("store_bytes", lambda: db.get_collection_info()['storage_bytes'],
+                           "Approximate bytes held by the record store.")
+    METRICS.register_gauge("store_records", lambda: db.get_collection_info()['total_records'],
+                           "Live records in the store.")
+    METRICS.register_gauge("dedup_ratio", lambda: db.get_collection_info()['dedup_ratio'],
+                           "Fraction of ingested records that were near-duplicates.")
+    
+    api = MedSecureAPI(PHIMasker(), embedder, db, args.max_in_flight, args.workers, args.mask_processes,
+                       args.embed_batch_size, args.embed_batch_wait_ms / 1000)
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        print("👋 Shutting down")
+    finally:
+        api.close()
+
+if __name__ == "__main__":
+    main()
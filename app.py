@@ -3,6 +3,8 @@ import pandas as pd
 from phi_masking import PHIMasker
 from embeddings import MedicalEmbedder
 from cyborgdb_client import MedicalVectorDB
+from metrics import METRICS
+from triage import emergency_triage
 
 # Configure the app
 st.set_page_config(
@@ -29,57 +31,21 @@ DRUG_INTERACTIONS = {
     ('lisinopril', 'calcium'): '✅ SAFE: No known interactions'
 }
 
-# EMERGENCY TRIAGE KEYWORDS
-EMERGENCY_KEYWORDS = [
-    'chest pain', 'shortness of breath', 'severe bleeding', 'unconscious',
-    'stroke', 'heart attack', 'suicidal', 'seizure', 'choking'
-]
-
-URGENT_KEYWORDS = [
-    'high fever', 'head injury', 'abdominal pain', 'severe burn',
-    'broken bone', 'eye injury', 'severe headache'
-]
-
 # Initialize components
 @st.cache_resource
 def load_components():
     masker = PHIMasker()
     embedder = MedicalEmbedder()
-    db = MedicalVectorDB()
+    # Near-duplicates stay viewable but are linked to their original and kept out of search results
+    db = MedicalVectorDB(dedup="link")
+    METRICS.register_gauge("store_bytes", lambda: db.get_collection_info()['storage_bytes'],
+                           "Approximate bytes held by the record store.")
+    METRICS.register_gauge("store_records", lambda: db.get_collection_info()['total_records'],
+                           "Live records in the store.")
+    METRICS.register_gauge("dedup_ratio", lambda: db.get_collection_info()['dedup_ratio'],
+                           "Fraction of ingested records that were near-duplicates.")
     return masker, embedder, db
 
-def emergency_triage(symptoms):
-    """Enhanced emergency triage system"""
-    symptoms_lower = symptoms.lower()
-    
-    # Check for emergency keywords
-    for keyword in EMERGENCY_KEYWORDS:
-        if keyword in symptoms_lower:
-            return {
-                "level": "🚨 EMERGENCY",
-                "color": "red",
-                "action": "CALL 911 IMMEDIATELY - Life-threatening condition suspected",
-                "instructions": "Do not delay. Seek emergency medical care now."
-            }
-    
-    # Check for urgent keywords
-    for keyword in URGENT_KEYWORDS:
-        if keyword in symptoms_lower:
-            return {
-                "level": "⚠️ URGENT",
-                "color": "orange", 
-                "action": "Visit urgent care within 24 hours",
-                "instructions": "Condition requires prompt medical attention."
-            }
-    
-    # Default non-urgent
-    return {
-        "level": "✅ NON-URGENT", 
-        "color": "green",
-        "action": "Schedule with primary care doctor",
-        "instructions": "Monitor symptoms and seek care if they worsen."
-    }
-
 def main():
     st.title("🏥 MedSecure AI - Clinical Decision Support")
     st.markdown("### HIPAA-Compliant Medical AI with Encrypted Vector Search")
@@ -149,11 +115,11 @@ def symptom_checker_ui(masker, embedder, db):
                     results = db.search_similar_cases(masked_symptoms, top_k=3)
                     
                     # Display results
-                    display_symptom_results(results, symptoms)
+                    display_symptom_results(results, symptoms, db.get_collection_info().get('encrypted', False))
             else:
                 st.warning("Please enter symptoms to analyze")
 
-def display_symptom_results(results, original_symptoms):
+def display_symptom_results(results, original_symptoms, encrypted=False):
     st.subheader("🔍 Similar Cases Found")
     
     if results and results['documents'][0]:
@@ -169,11 +135,11 @@ def display_symptom_results(results, original_symptoms):
     else:
         st.info("No similar cases found. This appears to be a new symptom pattern.")
     
-    # Add AI insights
-    st.info("""
+    # Add AI insights; only claim encryption at rest when the store really does it
+    at_rest = "\n    - Stored medical notes encrypted at rest (AES-GCM)" if encrypted else ""
+    st.info(f"""
     **🔒 Privacy & Security Features:**
-    - All personal identifiers removed before processing
-    - Medical data stored as encrypted vectors
+    - All personal identifiers removed before processing{at_rest}
     - No patient information exposed during search
     - HIPAA-compliant data handling
     """)
@@ -276,7 +242,7 @@ def database_management_ui(db, masker, embedder):
         st.metric("Storage Type", "Mock Vector DB")
     
     # Tabs for different operations
-    tab1, tab2, tab3 = st.tabs(["📥 Add Records", "🔍 View All Records", "🛠️ Maintenance"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📥 Add Records", "🔍 View All Records", "🛠️ Maintenance", "📈 Performance"])
     
     with tab1:  # Add Records Tab
         st.subheader("Add Medical Records")
@@ -295,8 +261,7 @@ def database_management_ui(db, masker, embedder):
                         "diagnosis": diagnosis,
                         "urgency": urgency,
                         "category": "custom",
-                        "original_text": custom_text,  # Store original for demo
-                        "phi_removed": True
+                        "phi_removed": True  # raw text with PHI is shown below but never stored
                     }
                     record_id = db.store_medical_record(masked_text, metadata)
                     st.success(f"✅ Record added! ID: {record_id}")
@@ -349,35 +314,62 @@ def database_management_ui(db, masker, embedder):
     with tab2:  # View All Records Tab
         st.subheader("🔍 View All Database Records")
         
-        if st.button("🔄 Load All Records", type="primary"):
-            try:
-                # Get all records from database
-                records_list = db.get_records_list()
-                
-                if records_list:
-                    st.success(f"📊 Found {len(records_list)} records in database:")
+        col_size, col_order = st.columns(2)
+        with col_size:
+            page_size = st.selectbox("Records per page", [10, 25, 50, 100], index=1)
+        with col_order:
+            order = st.radio("Sort by date added", ["Newest first", "Oldest first"], horizontal=True)
+        order = "desc" if order == "Newest first" else "asc"
+        
+        # Cursor for the start of each visited page; reset when the view changes
+        view_key = (page_size, order)
+        if st.session_state.get("records_view") != view_key:
+            st.session_state.records_view = view_key
+            st.session_state.records_cursors = [None]
+        cursors = st.session_state.records_cursors
+        
+        try:
+            page = db.get_records_page(cursors[-1], limit=page_size, order=order)
+        except Exception as e:
+            st.error(f"❌ Error loading records: {e}")
+            st.info("The database might not support this feature yet.")
+            page = {'records': [], 'next_cursor': None}
+        
+        records_list = page['records']
+        page_number = len(cursors)
+        first_index = (page_number - 1) * page_size
+        
+        if records_list:
+            st.success(f"📊 Showing records {first_index + 1}-{first_index + len(records_list)} "
+                       f"of {info['total_records']} (page {page_number})")
+            
+            # Display each record on this page
+            for i, record in enumerate(records_list, start=first_index):
+                with st.expander(f"Record {i+1} | 🆔 {record['id'][:8]}... | ⚠️ {record['urgency']}", expanded=False):
+                    col1, col2 = st.columns([3, 1])
                     
-                    # Display each record
-                    for i, record in enumerate(records_list):
-                        with st.expander(f"Record {i+1} | 🆔 {record['id'][:8]}... | ⚠️ {record['urgency']}", expanded=False):
-                            col1, col2 = st.columns([3, 1])
-                            
-                            with col1:
-                                st.write(f"**Medical Text:** {record['text']}")
-                                if 'original_text' in record:
-                                    st.write(f"**Original Text:** {record['original_text']}")
-                            
-                            with col2:
-                                st.write(f"**Diagnosis:** {record['diagnosis']}")
-                                st.write(f"**Category:** {record['category']}")
-                                st.write(f"**PHI Removed:** {record['phi_removed']}")
-                                st.write(f"**Added:** {record['timestamp'][:19]}")
-                else:
-                    st.info("📭 No records found in database. Add some records in the 'Add Records' tab.")
+                    with col1:
+                        st.write(f"**Medical Text:** {record['text']}")
+                        st.caption("Record ID (for delete or correct in the Maintenance tab):")
+                        st.code(record['id'], language=None)
                     
-            except Exception as e:
-                st.error(f"❌ Error loading records: {e}")
-                st.info("The database might not support this feature yet.")
+                    with col2:
+                        st.write(f"**Diagnosis:** {record['diagnosis']}")
+                        st.write(f"**Category:** {record['category']}")
+                        st.write(f"**PHI Removed:** {record['phi_removed']}")
+                        st.write(f"**Added:** {record['timestamp'][:19]}")
+        else:
+            st.info("📭 No records found in database. Add some records in the 'Add Records' tab.")
+        
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            if st.button("⬅️ Previous Page", disabled=page_number == 1):
+                cursors.pop()
+                st.rerun()
+        with col_next:
+            if st.button("Next Page ➡️", disabled=page['next_cursor'] is None):
+                cursors.append(page['next_cursor'])
+                st.rerun()
         
         # Search functionality
         st.subheader("🔎 Search Records")
@@ -410,6 +402,41 @@ def database_management_ui(db, masker, embedder):
             if st.button("📊 Update Statistics"):
                 st.success("Statistics updated!")
                 info = db.get_collection_info()
+            
+            st.write("**Delete or Correct a Record**")
+            st.caption("A corrected record keeps its ID and the date it was added.")
+            record_id = st.text_input("Record ID:")
+            corrected_text = st.text_area("Corrected medical text (PHI will be masked):")
+            
+            if st.button("✏️ Update Record"):
+                if record_id and corrected_text:
+                    if db.update_medical_record(record_id.strip(), masker.mask_phi(corrected_text)):
+                        st.success("Record updated!")
+                    else:
+                        st.error("No record found with that ID")
+                else:
+                    st.warning("Please enter a record ID and the corrected text")
+            
+            if st.button("🗑️ Delete Record"):
+                if record_id:
+                    if db.delete_medical_record(record_id.strip()):
+                        st.success("Record deleted!")
+                    else:
+                        st.error("No record found with that ID")
+                else:
+                    st.warning("Please enter a record ID")
+            
+            if st.button("🧹 Compact Storage"):
+                stats = db.compact()
+                if stats:
+                    st.success(f"Removed {stats['removed_records']} deleted records, "
+                               f"reclaimed ~{stats['reclaimed_bytes']:,} bytes")
+            
+            if info.get('last_compaction'):
+                st.caption(f"Last compaction: {info['last_compaction']['timestamp'][:19]} | "
+                           f"reclaimed ~{info['last_compaction']['reclaimed_bytes']:,} bytes")
+            st.caption(f"Tombstones: {info.get('deleted_records', 0)} "
+                       f"({info.get('tombstone_ratio', 0):.0%} of storage)")
         
         with col2:
             st.write("**Danger Zone**")
@@ -439,6 +466,70 @@ def database_management_ui(db, masker, embedder):
                     db.store_medical_record(masked_text, metadata)
                 st.success("Database reset with 4 demo records!")
                 st.rerun()
+    
+    with tab4:  # Performance Tab
+        performance_panel_ui(db)
+
+def performance_panel_ui(db):
+    st.subheader("📈 Live Performance")
+    
+    info = db.get_collection_info()
+    snapshot = METRICS.snapshot()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Store Memory", f"{info['storage_bytes'] / 1024 / 1024:.2f} MB")
+    with col2:
+        st.metric("Live Records", info['total_records'])
+    with col3:
+        st.metric("Tombstones", f"{info.get('tombstone_ratio', 0):.0%}")
+    with col4:
+        st.metric("Near-Duplicates", f"{info.get('dedup_ratio', 0):.0%}")
+    
+    if info.get('encryption'):
+        encryption = info['encryption']
+        st.caption(f"🔒 Encrypted at rest: {encryption['sealed_blocks']} AES-GCM blocks + "
+                   f"{encryption['tail_chunks']} chunks | "
+                   f"decrypted read cache {encryption['cache_bytes'] / 1024 / 1024:.1f} MB "
+                   f"({encryption['cached_blocks']} blocks) | {encryption['decrypted_blocks']} block decryptions")
+    
+    st.write("**Stage Latencies** (since app start)")
+    if snapshot['stages']:
+        stages = pd.DataFrame.from_dict(snapshot['stages'], orient='index')
+        stages.columns = ["Calls", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)"]
+        st.dataframe(stages, use_container_width=True)
+    else:
+        st.info("No pipeline activity recorded yet. Analyze symptoms or add records to see latencies.")
+    
+    if snapshot['counters']:
+        st.write("**Counters**")
+        st.json(snapshot['counters'])
+    
+    col_profile, col_actions = st.columns(2)
+    with col_profile:
+        st.write("**Sampled Profiling**")
+        sample_rate = st.slider("Fraction of calls to profile", 0.0, 0.2, METRICS.profile_sample_rate, 0.01)
+        trace_memory = st.checkbox("Track allocations (tracemalloc)", value=METRICS.trace_memory)
+        if sample_rate != METRICS.profile_sample_rate or trace_memory != METRICS.trace_memory:
+            if sample_rate or trace_memory:
+                METRICS.enable_profiling(sample_rate, trace_memory)
+            else:
+                METRICS.disable_profiling()
+        with st.expander("🔬 Profile Report"):
+            st.code(METRICS.profile_report(limit=25))
+    
+    with col_actions:
+        st.write("**Export**")
+        metrics_text = METRICS.export_prometheus()
+        st.download_button("⬇️ Download Metrics (Prometheus)", metrics_text,
+                           file_name="medsecure_metrics.txt", mime="text/plain")
+        if st.button("🔄 Reset Metrics"):
+            METRICS.reset()
+            st.rerun()
+    
+    with st.expander("📄 Metrics Text"):
+        st.code(metrics_text)
+
 def about_ui():
     st.header("About MedSecure AI")
     
@@ -0,0 +1,581 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from array import array
+from datetime import datetime
+
+from encryption import DEFAULT_CACHE_BLOCKS
+from mock_database import MockMedicalVectorDB
+from synthetic_data import iter_records, sample_queries
+
+def _sample_records(count, seed=0):
+    """Yield (text, metadata) pairs shaped like what app.py stores"""
+    for record in iter_records(count, seed):
+        yield record['text'], {**record['metadata'], 'phi_removed': True}
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the per-record prints of the components under test"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def _traced_bytes(build):
+    """Bytes still allocated after ``build()`` returns, and the object it built"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+def benchmark_memory_per_record(count=100_000, seed=0):
+    """Compare bytes per record of the columnar store with the old dict-of-dicts layout"""
+    print(f"🧪 Measuring memory per record with {count:,} records...")
+    
+    def build_legacy():
+        # The layout MockMedicalVectorDB used before records went columnar
+        records = {}
+        for text, metadata in _sample_records(count, seed):
+            records[str(uuid.uuid4())] = {
+                **metadata,
+                'timestamp': datetime.now().isoformat(),
+                'phi_removed': True,
+                'text': text
+            }
+        return records
+    
+    def build_columnar(encrypt):
+        with _quiet():
+            db = MockMedicalVectorDB(encrypt=encrypt)
+            for text, metadata in _sample_records(count, seed):
+                db.store_medical_record(text, metadata)
+        return db
+    
+    text_bytes = sum(len(text.encode('utf-8')) for text, _ in _sample_records(count, seed))
+    legacy_bytes, legacy = _traced_bytes(build_legacy)
+    del legacy
+    # The layout comparison is plaintext against plaintext; encryption is measured on its own
+    columnar_bytes, db = _traced_bytes(lambda: build_columnar(encrypt=False))
+    assert db.get_collection_info()['total_records'] == count
+    del db
+    encrypted_bytes, db = _traced_bytes(lambda: build_columnar(encrypt=True))
+    del db
+    
+    results = {
+        'benchmark': 'memory_per_record',
+        'records': count,
+        'text_bytes_per_record': round(text_bytes / count, 1),
+        'legacy_bytes_per_record': round(legacy_bytes / count, 1),
+        'columnar_bytes_per_record': round(columnar_bytes / count, 1),
+        'reduction': round(legacy_bytes / columnar_bytes, 2),
+        'encrypted_columnar_bytes_per_record': round(encrypted_bytes / count, 1)
+    }
+    print(f"📊 Raw text:       {results['text_bytes_per_record']:>8} bytes/record")
+    print(f"📊 Dict layout:    {results['legacy_bytes_per_record']:>8} bytes/record")
+    print(f"📊 Columnar:       {results['columnar_bytes_per_record']:>8} bytes/record")
+    print(f"✅ Columnar layout uses {results['reduction']}x less memory")
+    print(f"🔒 Encrypted:      {results['encrypted_columnar_bytes_per_record']:>8} bytes/record "
+          f"(default store, before reads fill its decrypted-block cache)")
+    return results
+
+def benchmark_concurrent_reads(count=20_000, readers=8, writers=2, duration=5.0, seed=0):
+    """Read throughput of one shared store with and without concurrent writers.
+    
+    Mirrors many Streamlit sessions sharing the cached database: reader threads
+    run searches while writer threads store, correct and delete records.
+    """
+    print(f"🧪 Concurrent store benchmark: {count:,} records, {readers} readers, {writers} writers")
+    with _quiet():
+        db = MockMedicalVectorDB()
+        for text, metadata in _sample_records(count, seed):
+            db.store_medical_record(text, metadata)
+    
+    def run_phase(writer_count):
+        stop = threading.Event()
+        latencies = [[] for _ in range(readers)]
+        writes = [0] * writer_count
+        errors = []
+        
+        def reader(index):
+            rng = random.Random(seed + index)
+            queries = sample_queries(50, seed + index)
+            try:
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    db.search_similar_cases(rng.choice(queries), top_k=5)
+                    latencies[index].append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(repr(e))
+        
+        def writer(index):
+            rng = random.Random(seed + 1000 + index)
+            try:
+                for text, metadata in _sample_records(None, seed + 1000 + index):
+                    if stop.is_set():
+                        return
+                    record_id = db.store_medical_record(text, metadata)
+                    if rng.random() < 0.3:
+                        db.update_medical_record(record_id, text + " (corrected)")
+                    if rng.random() < 0.3:
+                        db.delete_medical_record(record_id)
+                    writes[index] += 1
+            except Exception as e:
+                errors.append(repr(e))
+        
+        threads = ([threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+                   + [threading.Thread(target=writer, args=(i,)) for i in range(writer_count)])
+        with _quiet():
+            for thread in threads:
+                thread.start()
+            time.sleep(duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        
+        all_latencies = sorted(latency for reader_latencies in latencies for latency in reader_latencies)
+        return {
+            'writers': writer_count,
+            'reads_per_sec': round(len(all_latencies) / duration, 1),
+            'writes_per_sec': round(sum(writes) / duration, 1),
+            'read_p50_ms': round(_percentile(all_latencies, 50) * 1000, 3),
+            'read_p99_ms': round(_percentile(all_latencies, 99) * 1000, 3),
+            'errors': errors
+        }
+    
+    phases = [run_phase(0), run_phase(writers)]
+    for phase in phases:
+        print(f"📊 {phase['writers']} writers: {phase['reads_per_sec']:>9} reads/s "
+              f"(p50 {phase['read_p50_ms']} ms, p99 {phase['read_p99_ms']} ms), "
+              f"{phase['writes_per_sec']} writes/s, {len(phase['errors'])} errors")
+    
+    results = {
+        'benchmark': 'concurrent_reads',
+        'records': count,
+        'readers': readers,
+        'duration_sec': duration,
+        'phases': phases,
+        'final_records': db.get_collection_info()['total_records']
+    }
+    print("✅ No reader errors under concurrent writes" if not any(p['errors'] for p in phases)
+          else "❌ Readers failed under concurrent writes")
+    return results
+
+def benchmark_sharded_search(count=2_000_000, dim=384, worker_counts=None, queries=200,
+                             batch_size=32, top_k=5, seed=0):
+    """Query latency and QPS of the sharded vector index as the worker count grows.
+    
+    The corpus is random unit vectors generated straight into shared memory, so a
+    multi-million-vector run only holds one copy of the matrix.
+    """
+    import numpy as np
+    from sharded_search import ShardedVectorIndex, _local_top_k
+    
+    cpu_count = os.cpu_count() or 1
+    if worker_counts is None:
+        worker_counts = sorted({1, 2, 4, 8, cpu_count} & set(range(1, cpu_count + 1)))
+    print(f"🧪 Sharded search benchmark: {count:,} x {dim} vectors, workers {worker_counts}, "
+          f"{cpu_count} CPUs")
+    
+    rng = np.random.default_rng(seed)
+    index = ShardedVectorIndex(count, dim)
+    try:
+        for start in range(0, count, 65536):
+            rows = min(65536, count - start)
+            index.vectors[start:start + rows] = rng.standard_normal((rows, dim), dtype=np.float32)
+        index.normalize()
+        query_vectors = rng.standard_normal((queries, dim), dtype=np.float32)
+        query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        
+        # Single-process NumPy baseline over the same matrix
+        started = time.perf_counter()
+        for query in query_vectors[:max(queries // 10, 1)]:
+            _local_top_k(index.vectors, query[None, :], top_k)
+        baseline_ms = (time.perf_counter() - started) / max(queries // 10, 1) * 1000
+        print(f"📊 In-process baseline: {baseline_ms:.2f} ms/query")
+        
+        runs = []
+        for workers in worker_counts:
+            index.start(workers)
+            try:
+                index.search(query_vectors[0], top_k)  # warm-up
+                latencies = []
+                for query in query_vectors:
+                    started = time.perf_counter()
+                    index.search(query, top_k)
+                    latencies.append(time.perf_counter() - started)
+                
+                started = time.perf_counter()
+                for start in range(0, queries, batch_size):
+                    index.search_batch(query_vectors[start:start + batch_size], top_k)
+                batch_elapsed = time.perf_counter() - started
+            finally:
+                index.stop()
+            
+            latencies.sort()
+            run = {
+                'workers': workers,
+                'latency_p50_ms': round(_percentile(latencies, 50) * 1000, 3),
+                'latency_p99_ms': round(_percentile(latencies, 99) * 1000, 3),
+                'qps': round(len(latencies) / sum(latencies), 1),
+                'batched_qps': round(queries / batch_elapsed, 1)
+            }
+            runs.append(run)
+            print(f"📊 {workers:>3} workers: p50 {run['latency_p50_ms']} ms, p99 {run['latency_p99_ms']} ms, "
+                  f"{run['qps']} QPS, {run['batched_qps']} QPS batched ({batch_size}/batch)")
+    finally:
+        index.close()
+    
+    return {
+        'benchmark': 'sharded_search',
+        'vectors': count,
+        'dim': dim,
+        'cpu_count': cpu_count,
+        'top_k': top_k,
+        'baseline_ms_per_query': round(baseline_ms, 3),
+        'runs': runs
+    }
+
+def _environment():
+    """Where a result came from, so runs can be compared across versions"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit or None,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def _stage_summary(latencies, elapsed=None):
+    """Throughput and latency percentiles for one pipeline stage"""
+    ordered = sorted(latencies)
+    elapsed = sum(ordered) if elapsed is None else elapsed
+    return {
+        'ops': len(ordered),
+        'throughput_per_sec': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 4) if ordered else 0.0,
+        'p50_ms': round(_percentile(ordered, 50) * 1000, 4),
+        'p95_ms': round(_percentile(ordered, 95) * 1000, 4),
+        'p99_ms': round(_percentile(ordered, 99) * 1000, 4)
+    }
+
+def benchmark_pipeline(scales=(1_000, 100_000, 1_000_000), queries=100, embed_limit=1_000,
+                       top_k=5, seed=0):
+    """End-to-end benchmark: PHI masking, embedding, ingest and search on synthetic notes.
+    
+    Masking and ingest run over every record at each scale. Embedding runs on the
+    first ``embed_limit`` masked notes because the model, not the corpus size, sets
+    its cost. Search runs ``queries`` symptom queries against the full store.
+    """
+    from phi_masking import PHIMasker
+    
+    results = {'benchmark': 'pipeline', 'environment': _environment(), 'top_k': top_k,
+               'seed': seed, 'scales': []}
+    with _quiet():
+        masker = PHIMasker()
+        try:
+            from embeddings import MedicalEmbedder
+            embedder = MedicalEmbedder()
+        except Exception as e:  # model or sentence-transformers not available here
+            embedder = None
+            results['embedding_skipped'] = repr(e)
+    if embedder is None:
+        print(f"⚠️  Skipping embedding stage: {results['embedding_skipped']}")
+    
+    for scale in scales:
+        print(f"🧪 Pipeline benchmark at {scale:,} records...")
+        mask_latencies, ingest_latencies = array('d'), array('d')
+        embed_texts = []
+        with _quiet():
+            db = MockMedicalVectorDB()
+            for record in iter_records(scale, seed):
+                started = time.perf_counter()
+                masked_text = masker.mask_phi(record['text'])
+                masked = time.perf_counter()
+                db.store_medical_record(masked_text, record['metadata'])
+                mask_latencies.append(masked - started)
+                ingest_latencies.append(time.perf_counter() - masked)
+                if len(embed_texts) < embed_limit:
+                    embed_texts.append(masked_text)
+        stages = {
+            'mask': _stage_summary(mask_latencies),
+            'ingest': _stage_summary(ingest_latencies)
+        }
+        del mask_latencies, ingest_latencies
+        
+        if embedder is not None and embed_texts:
+            embed_latencies = array('d')
+            with _quiet():
+                for text in embed_texts:
+                    started = time.perf_counter()
+                    embedder.generate_embedding(text)
+                    embed_latencies.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                embedder.batch_generate_embeddings(embed_texts)
+                batch_elapsed = time.perf_counter() - started
+            stages['embed'] = _stage_summary(embed_latencies)
+            stages['embed_batch'] = {'ops': len(embed_texts),
+                                     'throughput_per_sec': round(len(embed_texts) / batch_elapsed, 1)}
+        
+        search_latencies = array('d')
+        with _quiet():
+            for query in sample_queries(queries, seed):
+                started = time.perf_counter()
+                db.search_similar_cases(query, top_k=top_k)
+                search_latencies.append(time.perf_counter() - started)
+        stages['search'] = _stage_summary(search_latencies)
+        
+        info = db.get_collection_info()
+        results['scales'].append({'records': scale, 'storage_bytes': info['storage_bytes'], 'stages': stages})
+        for name, stage in stages.items():
+            line = f"📊 {name:<12} {stage['throughput_per_sec']:>12,.1f} ops/s"
+            if 'p50_ms' in stage:
+                line += f"   p50 {stage['p50_ms']:.3f} ms  p95 {stage['p95_ms']:.3f} ms  p99 {stage['p99_ms']:.3f} ms"
+            print(line)
+        print(f"📊 storage      {info['storage_bytes']:>12,} bytes")
+        del db
+    
+    return results
+
+def benchmark_dedup(count=20_000, repeat_rate=0.3, threshold=0.85, queries=100, top_k=5, seed=0):
+    """Ingest masked synthetic notes with near-duplicate detection off, "skip" and "link".
+    
+    ``repeat_rate`` of the notes reuse an earlier note's template. Reports the
+    dedup ratio, store size (including the LSH index), ingest cost and search
+    latency of each mode.
+    """
+    from phi_masking import PHIMasker
+    
+    print(f"🧪 Dedup benchmark with {count:,} records ({repeat_rate:.0%} templated repeats)...")
+    with _quiet():
+        masker = PHIMasker()
+        notes = [(masker.mask_phi(record['text']), record['metadata'])
+                 for record in iter_records(count, seed, repeat_rate=repeat_rate)]
+    query_list = sample_queries(queries, seed)
+    results = {'benchmark': 'dedup', 'environment': _environment(), 'records': count,
+               'repeat_rate': repeat_rate, 'threshold': threshold, 'modes': {}}
+    
+    for mode in (None, 'skip', 'link'):
+        ingest_latencies, search_latencies = array('d'), array('d')
+        with _quiet():
+            db = MockMedicalVectorDB(dedup=mode, dedup_threshold=threshold)
+            for text, metadata in notes:
+                started = time.perf_counter()
+                db.store_medical_record(text, metadata)
+                ingest_latencies.append(time.perf_counter() - started)
+            for query in query_list:
+                started = time.perf_counter()
+                db.search_similar_cases(query, top_k=top_k)
+                search_latencies.append(time.perf_counter() - started)
+        info = db.get_collection_info()
+        name = mode or 'off'
+        results['modes'][name] = {
+            'stored_records': info['total_records'],
+            'dedup_ratio': info['dedup_ratio'],
+            'storage_bytes': info['storage_bytes'],
+            'dedup_index_bytes': info['dedup_index_bytes'],
+            'ingest': _stage_summary(ingest_latencies),
+            'search': _stage_summary(search_latencies)
+        }
+        stats = results['modes'][name]
+        print(f"📊 {name:<5} stored {stats['stored_records']:>8,}  dedup {stats['dedup_ratio']:>6.1%}  "
+              f"storage {stats['storage_bytes']:>12,} B (index {stats['dedup_index_bytes']:>10,})  ingest {stats['ingest']['throughput_per_sec']:>9,.0f}/s  "
+              f"search p95 {stats['search']['p95_ms']:.3f} ms")
+        del db
+    
+    return results
+
+def benchmark_encryption(count=50_000, queries=50, cache_blocks=(DEFAULT_CACHE_BLOCKS, 512), top_k=5, seed=0):
+    """Ingest, search and paging cost of the encrypted record store against plaintext.
+    
+    Each ``cache_blocks`` value is one encrypted run; a cache smaller than the
+    store makes every search decrypt most blocks again, while one that holds
+    the whole store keeps all of it decrypted in memory.
+    """
+    print(f"🧪 Encryption benchmark with {count:,} records...")
+    records = list(_sample_records(count, seed))
+    query_list = sample_queries(queries, seed)
+    results = {'benchmark': 'encryption', 'environment': _environment(), 'records': count,
+               'top_k': top_k, 'seed': seed, 'runs': {}}
+    
+    configs = [('plaintext', {'encrypt': False})]
+    configs += [(f'aes-gcm cache={blocks}', {'decrypted_cache_blocks': blocks}) for blocks in cache_blocks]
+    for name, options in configs:
+        ingest_latencies, search_latencies, page_latencies = array('d'), array('d'), array('d')
+        with _quiet():
+            db = MockMedicalVectorDB(**options)
+            for text, metadata in records:
+                started = time.perf_counter()
+                db.store_medical_record(text, metadata)
+                ingest_latencies.append(time.perf_counter() - started)
+            for query in query_list:
+                started = time.perf_counter()
+                db.search_similar_cases(query, top_k=top_k)
+                search_latencies.append(time.perf_counter() - started)
+            cursor = None
+            for _ in range(queries):
+                started = time.perf_counter()
+                cursor = db.get_records_page(cursor, order="desc")['next_cursor']
+                page_latencies.append(time.perf_counter() - started)
+        info = db.get_collection_info()
+        results['runs'][name] = {
+            'storage_bytes': info['storage_bytes'],
+            'encryption': info['encryption'],
+            'ingest': _stage_summary(ingest_latencies),
+            'search': _stage_summary(search_latencies),
+            'page': _stage_summary(page_latencies)
+        }
+        del db
+    
+    baseline = results['runs']['plaintext']
+    for name, run in results['runs'].items():
+        # Medians: a GC pause during one run shouldn't decide the comparison
+        overhead = {stage: run[stage]['p50_ms'] / baseline[stage]['p50_ms'] - 1 if baseline[stage]['p50_ms'] else 0.0
+                    for stage in ('ingest', 'search', 'page')}
+        run['overhead_vs_plaintext'] = {stage: round(change, 4) for stage, change in overhead.items()}
+        print(f"📊 {name:<18} ingest p50 {run['ingest']['p50_ms'] * 1000:>6.1f} us ({overhead['ingest']:+.1%})  "
+              f"search p50 {run['search']['p50_ms']:>8.2f} ms ({overhead['search']:+.1%})  "
+              f"page p50 {run['page']['p50_ms']:.3f} ms ({overhead['page']:+.1%})")
+    return results
+
+def compare_results(baseline, current, threshold=0.10):
+    """Compare two pipeline results; return the stages that regressed beyond ``threshold``.
+    
+    A stage regresses when its p95 latency grows, or its throughput drops, by more
+    than ``threshold`` (a fraction) relative to the baseline at the same scale.
+    """
+    baseline_scales = {scale['records']: scale['stages'] for scale in baseline['scales']}
+    regressions = []
+    print(f"🔍 Comparing {baseline['environment'].get('git_commit')} -> {current['environment'].get('git_commit')}")
+    for scale in current['scales']:
+        old_stages = baseline_scales.get(scale['records'])
+        if old_stages is None:
+            continue
+        for name, stage in scale['stages'].items():
+            old = old_stages.get(name)
+            if old is None:
+                continue
+            changes = {}
+            if old.get('p95_ms') and 'p95_ms' in stage:
+                changes['p95_ms'] = stage['p95_ms'] / old['p95_ms'] - 1
+            if old.get('throughput_per_sec'):
+                changes['throughput_per_sec'] = 1 - stage['throughput_per_sec'] / old['throughput_per_sec']
+            regressed = any(change > threshold for change in changes.values())
+            summary = ", ".join(
+                f"p95 {change:+.1%}" if metric == 'p95_ms' else f"throughput {-change:+.1%}"
+                for metric, change in changes.items()
+            )
+            print(f"{'❌' if regressed else '✅'} {scale['records']:>9,} {name:<12} {summary}")
+            if regressed:
+                regressions.append({'records': scale['records'], 'stage': name, 'changes': changes})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MedSecure AI performance benchmarks")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    
+    memory = subparsers.add_parser("memory", help="Memory per record, columnar vs dict layout")
+    memory.add_argument("--records", type=int, default=100_000)
+    memory.add_argument("--seed", type=int, default=0)
+    
+    concurrency = subparsers.add_parser("concurrency", help="Read throughput under concurrent writes")
+    concurrency.add_argument("--records", type=int, default=20_000)
+    concurrency.add_argument("--readers", type=int, default=8)
+    concurrency.add_argument("--writers", type=int, default=2)
+    concurrency.add_argument("--duration", type=float, default=5.0)
+    concurrency.add_argument("--seed", type=int, default=0)
+    
+    sharded = subparsers.add_parser("sharded", help="Sharded vector search latency/QPS vs worker count")
+    sharded.add_argument("--vectors", type=int, default=2_000_000)
+    sharded.add_argument("--dim", type=int, default=384)
+    sharded.add_argument("--workers", type=int, nargs="+", help="Worker counts to try (default: 1,2,4,8 up to CPU count)")
+    sharded.add_argument("--queries", type=int, default=200)
+    sharded.add_argument("--batch-size", type=int, default=32)
+    sharded.add_argument("--top-k", type=int, default=5)
+    sharded.add_argument("--seed", type=int, default=0)
+    
+    pipeline = subparsers.add_parser("pipeline", help="End-to-end mask/embed/ingest/search on synthetic notes")
+    pipeline.add_argument("--scales", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    pipeline.add_argument("--queries", type=int, default=100)
+    pipeline.add_argument("--embed-limit", type=int, default=1_000)
+    pipeline.add_argument("--top-k", type=int, default=5)
+    pipeline.add_argument("--seed", type=int, default=0)
+    
+    dedup = subparsers.add_parser("dedup", help="Near-duplicate detection: dedup ratio, store size and cost")
+    dedup.add_argument("--records", type=int, default=20_000)
+    dedup.add_argument("--repeat-rate", type=float, default=0.3)
+    dedup.add_argument("--threshold", type=float, default=0.85)
+    dedup.add_argument("--queries", type=int, default=100)
+    dedup.add_argument("--top-k", type=int, default=5)
+    dedup.add_argument("--seed", type=int, default=0)
+    
+    encryption = subparsers.add_parser("encryption", help="Cost of encryption at rest vs plaintext")
+    encryption.add_argument("--records", type=int, default=50_000)
+    encryption.add_argument("--queries", type=int, default=50)
+    encryption.add_argument("--cache-blocks", type=int, nargs="+", default=[DEFAULT_CACHE_BLOCKS, 512],
+                            help="Decrypted-block cache sizes to try")
+    encryption.add_argument("--top-k", type=int, default=5)
+    encryption.add_argument("--seed", type=int, default=0)
+    
+    compare = subparsers.add_parser("compare", help="Flag regressions between two pipeline result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10)
+    
+    args = parser.parse_args(argv)
+    if args.benchmark == "memory":
+        results = benchmark_memory_per_record(args.records, args.seed)
+    elif args.benchmark == "concurrency":
+        results = benchmark_concurrent_reads(args.records, args.readers, args.writers,
+                                             args.duration, args.seed)
+    elif args.benchmark == "sharded":
+        results = benchmark_sharded_search(args.vectors, args.dim, args.workers, args.queries,
+                                           args.batch_size, args.top_k, args.seed)
+    elif args.benchmark == "pipeline":
+        results = benchmark_pipeline(args.scales, args.queries, args.embed_limit, args.top_k, args.seed)
+    elif args.benchmark == "dedup":
+        results = benchmark_dedup(args.records, args.repeat_rate, args.threshold, args.queries,
+                                  args.top_k, args.seed)
+    elif args.benchmark == "encryption":
+        results = benchmark_encryption(args.records, args.queries, args.cache_blocks, args.top_k, args.seed)
+    elif args.benchmark == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        results = compare_results(baseline, current, args.threshold)
+        if results:
+            print(f"❌ {len(results)} stage(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import re
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+_SHIFT = np.uint64(32)
+_MASK64 = (1 << 64) - 1
+
+def shingles(text, size=3):
+    """Lower-cased word ``size``-grams of ``text`` as 32-bit hashes.
+    
+    Redaction tags like ``[phone_REDACTED]`` are ordinary tokens, so notes that
+    only differed in their PHI shingle identically once masked. Hashes use
+    Python's string hash, so they are only comparable within one process.
+    """
+    tokens = _TOKEN.findall(text.lower())
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    if len(tokens) < size:
+        grams = [tuple(tokens)]
+    else:
+        grams = list(zip(*(tokens[i:] for i in range(size))))
+    return np.fromiter((hash(gram) & 0xFFFFFFFF for gram in grams), dtype=np.uint64, count=len(grams))
+
+class NearDuplicateIndex:
+    """MinHash signatures with an LSH banding index for near-duplicate lookup.
+    
+    Each text gets ``num_perm`` MinHash values; the fraction that agree between two
+    signatures estimates the Jaccard similarity of their shingle sets. Signatures
+    are cut into ``bands`` bands and each band is hashed into a bucket, so only
+    records sharing at least one bucket are compared: a lookup costs two binary
+    searches plus one vectorized comparison, not a scan of the store.
+    
+    To stay small next to the records it indexes, signatures keep the low 16 bits
+    of each MinHash value in one growable matrix, and band buckets are a sorted
+    (hash, row) array. New entries collect in a small dict that is merged into the
+    array in bulk, which is also when removed rows are purged and become reusable.
+    """
+    
+    # Merge pending bucket entries once there are this many, or a quarter of the sorted array
+    MERGE_MIN_ENTRIES = 4096
+    
+    def __init__(self, threshold=0.85, num_perm=64, bands=8, shingle_size=3, seed=1):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Multiply-shift hashing, (a * x + b) >> 32 with odd a and wrapping uint64
+        # arithmetic: as good as a prime modulus for MinHash and much cheaper
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+        self.clear()
+    
+    def clear(self):
+        self._matrix = np.empty((0, self.num_perm), dtype=np.uint16)
+        self._row_keys = []        # row -> key, None once removed
+        self._rows = {}            # key -> row
+        self._free_rows = []       # removed rows whose bucket entries have been purged
+        self._removed_rows = 0     # removed rows still referenced by bucket entries
+        self._bucket_hashes = np.empty(0, dtype=np.uint64)   # sorted
+        self._bucket_rows = np.empty(0, dtype=np.int32)
+        self._pending = {}         # band hash -> row, or list of rows; not merged yet
+        self._pending_entries = 0
+    
+    def __len__(self):
+        return len(self._rows)
+    
+    def __contains__(self, key):
+        return key in self._rows
+    
+    def signature(self, text):
+        """MinHash signature of ``text``, or None if it has no tokens"""
+        hashes = shingles(text, self.shingle_size)
+        if not len(hashes):
+            return None
+        return ((self._a * hashes + self._b) >> _SHIFT).min(axis=1).astype(np.uint32)
+    
+    def _band_hashes(self, signature):
+        # The band number is hashed in so equal values in different bands don't collide
+        data, width = signature.tobytes(), self.rows * signature.itemsize
+        return [hash((band, data[band * width:(band + 1) * width])) & _MASK64 for band in range(self.bands)]
+    
+    def _candidates(self, band_hashes):
+        candidates = set()
+        if len(self._bucket_hashes):
+            needles = np.array(band_hashes, dtype=np.uint64)
+            starts = np.searchsorted(self._bucket_hashes, needles, side='left')
+            ends = np.searchsorted(self._bucket_hashes, needles, side='right')
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end > start:
+                    candidates.update(self._bucket_rows[start:end].tolist())
+        for band_hash in band_hashes:
+            bucket = self._pending.get(band_hash)
+            if bucket is None:
+                continue
+            if isinstance(bucket, int):
+                candidates.add(bucket)
+            else:
+                candidates.update(bucket)
+        return [row for row in candidates if self._row_keys[row] is not None]
+    
+    def query(self, signature):
+        """Best indexed match for ``signature`` as ``(key, similarity)``, or None below the threshold"""
+        if signature is None or not self._rows:
+            return None
+        candidates = self._candidates(self._band_hashes(signature))
+        if not candidates:
+            return None
+        rows = np.array(candidates, dtype=np.intp)
+        agreement = np.count_nonzero(self._matrix[rows] == signature.astype(np.uint16), axis=1)
+        best = int(agreement.argmax())
+        similarity = float(agreement[best]) / self.num_perm
+        if similarity < self.threshold:
+            return None
+        return self._row_keys[rows[best]], similarity
+    
+    def _allocate_row(self):
+        if self._free_rows:
+            return self._free_rows.pop()
+        row = len(self._row_keys)
+        if row == len(self._matrix):
+            grown = np.empty((max(row + row // 2, 64), self.num_perm), dtype=np.uint16)
+            grown[:row] = self._matrix[:row]
+            self._matrix = grown
+        self._row_keys.append(None)
+        return row
+    
+    def add(self, key, signature):
+        """Index ``signature`` under ``key``, replacing any previous signature for it"""
+        self.remove(key)
+        if signature is None:
+            return
+        row = self._allocate_row()
+        self._matrix[row] = signature.astype(np.uint16)
+        self._row_keys[row] = key
+        self._rows[key] = row
+        for band_hash in self._band_hashes(signature):
+            bucket = self._pending.get(band_hash)
+            if bucket is None:
+                self._pending[band_hash] = row
+            elif isinstance(bucket, int):
+                self._pending[band_hash] = [bucket, row]
+            else:
+                bucket.append(row)
+        self._pending_entries += self.bands
+        if self._pending_entries >= max(self.MERGE_MIN_ENTRIES, len(self._bucket_hashes) // 4):
+            self._merge()
+    
+    def remove(self, key):
+        """Drop ``key`` from the index. Returns False if it wasn't indexed."""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._row_keys[row] = None
+        self._removed_rows += 1
+        if self._removed_rows * self.bands >= max(self.MERGE_MIN_ENTRIES, len(self._bucket_hashes) // 4):
+            self._merge()
+        return True
+    
+    def _merge(self):
+        """Fold pending entries into the sorted bucket array and purge removed rows"""
+        pending_hashes, pending_rows = [], []
+        for band_hash, bucket in self._pending.items():
+            for row in ([bucket] if isinstance(bucket, int) else bucket):
+                pending_hashes.append(band_hash)
+                pending_rows.append(row)
+        hashes = np.concatenate([self._bucket_hashes, np.array(pending_hashes, dtype=np.uint64)])
+        rows = np.concatenate([self._bucket_rows, np.array(pending_rows, dtype=np.int32)])
+        live = np.array([key is not None for key in self._row_keys], dtype=bool)
+        keep = live[rows]
+        hashes, rows = hashes[keep], rows[keep]
+        order = np.argsort(hashes, kind='stable')
+        self._bucket_hashes, self._bucket_rows = hashes[order], rows[order]
+        self._pending = {}
+        self._pending_entries = 0
+        self._free_rows = np.flatnonzero(~live).tolist()
+        self._removed_rows = 0
+    
+    def nbytes(self):
+        """Approximate bytes held by the index"""
+        # ~100 bytes per dict entry (slot plus int key and value objects)
+        return (self._matrix.nbytes + self._bucket_hashes.nbytes + self._bucket_rows.nbytes
+                + 100 * (len(self._rows) + len(self._pending)) + 8 * len(self._row_keys))
+
+def test_dedup():
+    """Test near-duplicate detection"""
+    print("🧪 Testing Near-Duplicate Detection...")
+    
+    index = NearDuplicateIndex(threshold=0.7)
+    notes = [
+        "[patient_name_REDACTED]. Presents with chest pain and shortness of breath for 2 days. "
+        "Seen by [doctor_name_REDACTED] in clinic. Contact phone [phone_REDACTED]. "
+        "Current medications: aspirin, lisinopril. Assessment consistent with cardiac.",
+        "[patient_name_REDACTED]. Presents with cough and sore throat for 3 days. "
+        "Assessment consistent with common cold.",
+    ]
+    for key, note in enumerate(notes):
+        index.add(key, index.signature(note))
+    
+    queries = [
+        notes[0].replace("2 days", "3 days"),
+        "Patient reports lower back pain and stiffness after lifting boxes at work.",
+    ]
+    for query in queries:
+        match = index.query(index.signature(query))
+        print(f"🔍 {query[:60]}...")
+        if match:
+            print(f"   ♻️ Near-duplicate of note {match[0]} (similarity {match[1]:.2f})")
+        else:
+            print("   ✅ No near-duplicate found")
+
+if __name__ == "__main__":
+    test_dedup()
@@ -1,6 +1,12 @@
+import logging
+
 from sentence_transformers import SentenceTransformer
 import numpy as np
 
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
 class MedicalEmbedder:
     def __init__(self, model_name='all-MiniLM-L6-v2'):
         print("🔄 Loading AI model for medical embeddings...")
@@ -9,25 +15,27 @@ class MedicalEmbedder:
         print(f"✅ Medical Embedder initialized with model: {model_name}")
         print(f"📊 Vector dimension: {self.vector_dimension}")
     
+    @METRICS.timed("generate_embedding")
     def generate_embedding(self, text):
         """Generate embedding for medical text"""
         if not text:
-            print("⚠️  Warning: Empty text provided")
+            logger.warning("⚠️  Empty text provided")
             return np.zeros(self.vector_dimension).tolist()
         
         # Generate embedding
         embedding = self.model.encode(text)
-        print(f"📈 Generated embedding of length: {len(embedding)}")
+        logger.debug("📈 Generated embedding of length: %d", len(embedding))
         return embedding.tolist()
     
+    @METRICS.timed("batch_generate_embeddings")
     def batch_generate_embeddings(self, texts):
         """Generate embeddings for multiple texts efficiently"""
         if not texts:
             return []
         
-        print(f"🔄 Generating embeddings for {len(texts)} texts...")
+        logger.debug("🔄 Generating embeddings for %d texts...", len(texts))
         embeddings = self.model.encode(texts)
-        print(f"✅ Batch embedding generation complete")
+        METRICS.increment("embeddings_generated_total", len(texts))
         return embeddings.tolist()
 
 def test_embedder():
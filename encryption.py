@@ -0,0 +1,234 @@
+import bisect
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from metrics import METRICS
+
+# Plaintext bytes per full sealed block. Large blocks keep the per-block nonce, tag and
+# call overhead negligible; reads decrypt a whole block, so don't go much larger.
+DEFAULT_BLOCK_SIZE = 64 * 1024
+# Decrypted blocks kept in memory per arena after reads (1 MB at the default block size).
+# A scan of a store bigger than the cache misses anyway, so a larger cache buys little.
+DEFAULT_CACHE_BLOCKS = 16
+
+# Environment variable holding a hex-encoded 128/192/256-bit AES key
+KEY_ENV_VAR = "MEDSECURE_DB_KEY"
+
+_NONCE_BYTES = 12
+
+def load_key(key=None):
+    """AES key to use: ``key`` itself, else MEDSECURE_DB_KEY, else a fresh random key.
+    
+    A random key lives only as long as the process, like the in-memory store it protects.
+    """
+    if key is None:
+        key = os.environ.get(KEY_ENV_VAR)
+        if key is None:
+            return AESGCM.generate_key(bit_length=256)
+    if isinstance(key, str):
+        key = bytes.fromhex(key)
+    if len(key) not in (16, 24, 32):
+        raise ValueError("Encryption key must be 16, 24 or 32 bytes")
+    return key
+
+def _block_aad(index):
+    return struct.pack(">Q", index)
+
+def _chunk_aad(index, offset):
+    # Longer than a block's, so a chunk can never pass for a block or vice versa
+    return struct.pack(">QI", index, offset)
+
+class EncryptedArena:
+    """Append-only byte arena stored as AES-GCM sealed blocks.
+    
+    Behaves like the ``bytearray`` it replaces for ``+=``, ``len`` and slicing.
+    Each append is sealed on its own as a chunk of the last, partly filled block;
+    once ``block_size`` bytes have built up they are re-sealed as one full block.
+    Chunks and blocks use a random nonce and their position as associated data,
+    so they can't be altered or moved without failing authentication. Nothing
+    written is kept in plaintext, even before the first block fills up.
+    
+    Reads decrypt whole blocks (or just the chunks they need) on demand. Blocks
+    that were read go into a bounded LRU cache, so a scan costs one decryption
+    per block rather than per record; that cache, at most ``cache_blocks`` blocks
+    plus the last block read, is the only plaintext held between operations.
+    Safe for one writer and any number of concurrent readers of bytes already
+    appended, which is how ``MockMedicalVectorDB`` uses it.
+    """
+    
+    def __init__(self, key, block_size=DEFAULT_BLOCK_SIZE, cache_blocks=DEFAULT_CACHE_BLOCKS):
+        if block_size <= 0 or cache_blocks <= 0:
+            raise ValueError("block_size and cache_blocks must be positive")
+        self._key = key
+        self._aead = AESGCM(key)
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self._blocks = []                   # nonce + ciphertext + tag per full block
+        self._sealed_bytes = 0
+        # (plaintext offset of the tail, tail length, chunk end offsets, sealed chunks).
+        # Appends only extend the lists; sealing a block starts new ones, so a reader
+        # holding an old tuple still sees the bytes it expects.
+        self._tail = (0, 0, [], [])
+        self._tail_sealed_bytes = 0
+        self._cache = OrderedDict()         # block number -> plaintext bytes
+        self._cache_lock = threading.Lock()
+        self._last = (-1, b"")              # most recently read block, checked before the cache
+        self.decrypted_blocks = 0
+    
+    def empty_like(self):
+        """New empty arena with the same key and sizing"""
+        return EncryptedArena(self._key, self.block_size, self.cache_blocks)
+    
+    def __len__(self):
+        tail_start, tail_length, _, _ = self._tail
+        return tail_start + tail_length
+    
+    def __sizeof__(self):
+        # What is held at rest, all ciphertext; the read cache is reported separately
+        return (object.__sizeof__(self) + sys.getsizeof(self._blocks) + self._sealed_bytes
+                + sys.getsizeof(self._tail[3]) + self._tail_sealed_bytes)
+    
+    def _seal(self, plaintext, aad):
+        nonce = os.urandom(_NONCE_BYTES)
+        return nonce + self._aead.encrypt(nonce, plaintext, aad)
+    
+    def _open(self, sealed, aad):
+        return self._aead.decrypt(sealed[:_NONCE_BYTES], sealed[_NONCE_BYTES:], aad)
+    
+    def __iadd__(self, data):
+        if not data:
+            return self
+        tail_start, tail_length, ends, chunks = self._tail
+        size = self.block_size
+        if tail_length + len(data) < size:
+            # The common case: seal just the new bytes as one more chunk
+            sealed = self._seal(data, _chunk_aad(tail_start // size, tail_length))
+            chunks.append(sealed)
+            ends.append(tail_length + len(data))
+            self._tail_sealed_bytes += len(sealed)
+            self._tail = (tail_start, tail_length + len(data), ends, chunks)
+            return self
+        
+        index = tail_start // size
+        view = memoryview(self._tail_slice(self._tail, 0, tail_length) + bytes(data))
+        while len(view) >= size:
+            sealed = self._seal(view[:size], _block_aad(index))
+            self._blocks.append(sealed)
+            self._sealed_bytes += len(sealed)
+            index += 1
+            view = view[size:]
+        # Full blocks are in place before the tail moves past them
+        ends, chunks = [], []
+        if len(view):
+            chunks.append(self._seal(view, _chunk_aad(index, 0)))
+            ends.append(len(view))
+        self._tail_sealed_bytes = sum(len(chunk) for chunk in chunks)
+        self._tail = (index * size, len(view), ends, chunks)
+        return self
+    
+    def _tail_slice(self, tail, start, stop):
+        """Plaintext of ``[start, stop)`` within ``tail``, decrypting only the chunks it touches"""
+        tail_start, _, ends, chunks = tail
+        index = tail_start // self.block_size
+        position = bisect.bisect_right(ends, start)
+        chunk_start = ends[position - 1] if position else 0
+        parts = []
+        while chunk_start < stop:
+            plaintext = self._open(chunks[position], _chunk_aad(index, chunk_start))
+            parts.append(plaintext[max(start - chunk_start, 0):stop - chunk_start])
+            chunk_start = ends[position]
+            position += 1
+        return b"".join(parts)
+    
+    def _cache_put(self, index, plaintext):
+        with self._cache_lock:
+            self._cache[index] = plaintext
+            self._cache.move_to_end(index)
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+    
+    def _block(self, index):
+        tail = self._tail
+        if index * self.block_size >= tail[0]:
+            # The tail changes with every append, so it is never cached
+            return self._tail_slice(tail, 0, tail[1])
+        last = self._last
+        if last[0] == index:
+            return last[1]
+        with self._cache_lock:
+            plaintext = self._cache.get(index)
+            if plaintext is not None:
+                self._cache.move_to_end(index)
+        if plaintext is None:
+            with METRICS.span("decrypt_block"):
+                plaintext = self._open(self._blocks[index], _block_aad(index))
+            self.decrypted_blocks += 1
+            self._cache_put(index, plaintext)
+        self._last = (index, plaintext)
+        return plaintext
+    
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("EncryptedArena only supports slicing")
+        tail = self._tail
+        start, stop, _ = key.indices(tail[0] + tail[1])
+        if stop <= start:
+            return b""
+        if start >= tail[0]:
+            return self._tail_slice(tail, start - tail[0], stop - tail[0])
+        size = self.block_size
+        first, last = start // size, (stop - 1) // size
+        if first == last:
+            base = first * size
+            return bytes(self._block(first)[start - base:stop - base])
+        return b"".join(
+            self._block(index)[max(start - index * size, 0):min(stop - index * size, size)]
+            for index in range(first, last + 1)
+        )
+    
+    def block_at(self, offset):
+        """``(base, plaintext)`` of the block holding ``offset``, for callers scanning many slices.
+        
+        Slicing the returned block directly skips the per-slice cache lookup; a slice
+        that runs past the end of the block still has to go through ``self[start:stop]``.
+        """
+        index = offset // self.block_size
+        return index * self.block_size, self._block(index)
+    
+    def cache_nbytes(self):
+        with self._cache_lock:
+            return sum(len(plaintext) for plaintext in self._cache.values())
+    
+    def stats(self):
+        return {
+            'sealed_blocks': len(self._blocks),
+            'tail_chunks': len(self._tail[3]),
+            'ciphertext_bytes': self._sealed_bytes + self._tail_sealed_bytes,
+            'cached_blocks': len(self._cache),
+            'cache_bytes': self.cache_nbytes(),
+            'decrypted_blocks': self.decrypted_blocks
+        }
+
+def test_encryption():
+    """Test the encrypted arena"""
+    print("🧪 Testing Encrypted Arena...")
+    
+    arena = EncryptedArena(load_key(), block_size=64, cache_blocks=2)
+    notes = [f"[patient_name_REDACTED]. Presents with cough for {days} days.".encode() for days in range(1, 11)]
+    offsets = []
+    for note in notes:
+        offsets.append(len(arena))
+        arena += note
+    
+    print(f"📊 Stats: {arena.stats()}")
+    print(f"🔒 Plaintext visible at rest: {any(b'cough' in block for block in arena._blocks + arena._tail[3])}")
+    round_trip = all(arena[start:start + len(note)] == note for start, note in zip(offsets, notes))
+    print(f"{'✅' if round_trip else '❌'} Every record decrypts back to what was written")
+
+if __name__ == "__main__":
+    test_encryption()
@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+from synthetic_data import iter_records, sample_queries
+
+def _payloads(endpoint, count, seed, batch):
+    """Request bodies for an endpoint, built from the synthetic corpus"""
+    if endpoint == "search":
+        return [{"query": query, "top_k": 5} for query in sample_queries(count, seed)]
+    records = list(iter_records(count * batch, seed))
+    chunks = [records[i:i + batch] for i in range(0, len(records), batch)]
+    if endpoint == "records":
+        return [{"records": [{"text": r["text"], "metadata": r["metadata"]} for r in chunk]} for chunk in chunks]
+    if batch == 1:
+        return [{"text": chunk[0]["text"]} for chunk in chunks]
+    return [{"texts": [r["text"] for r in chunk]} for chunk in chunks]
+
+async def _request(reader, writer, host, path, body):
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    length, keep_alive = 0, True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "connection":
+            keep_alive = value.strip().lower() != "close"
+    await reader.readexactly(length)
+    return status, keep_alive
+
+async def run_load_test(host="127.0.0.1", port=8080, endpoint="search", connections=32,
+                        duration=10.0, batch=1, seed=0):
+    """Hammer one endpoint over keep-alive connections; report RPS and tail latency"""
+    path = f"/{endpoint}"
+    bodies = [json.dumps(payload).encode("utf-8") for payload in _payloads(endpoint, 500, seed, batch)]
+    latencies, statuses, errors = [], Counter(), Counter()
+    deadline = time.perf_counter() + duration
+    
+    async def client(index):
+        rng = random.Random(seed + index)
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                started = time.perf_counter()
+                status, keep_alive = await _request(reader, writer, host, path, rng.choice(bodies))
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+                errors[type(e).__name__] += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+                await asyncio.sleep(0.01)
+        if writer is not None:
+            writer.close()
+    
+    print(f"🧪 Load testing POST {path} on {host}:{port} with {connections} connections for {duration:.0f}s...")
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(connections)))
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    
+    def percentile(pct):
+        if not latencies:
+            return 0.0
+        return latencies[min(int(round(pct / 100 * (len(latencies) - 1))), len(latencies) - 1)] * 1000
+    
+    ok = statuses.get(200, 0)
+    results = {
+        "endpoint": path,
+        "connections": connections,
+        "batch": batch,
+        "duration_sec": round(elapsed, 2),
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "ok_rps": round(ok / elapsed, 1),
+        "p50_ms": round(percentile(50), 2),
+        "p95_ms": round(percentile(95), 2),
+        "p99_ms": round(percentile(99), 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "statuses": dict(statuses),
+        "errors": dict(errors)
+    }
+    print(f"📊 {results['rps']} req/s ({results['ok_rps']} OK/s) | p50 {results['p50_ms']} ms | "
+          f"p95 {results['p95_ms']} ms | p99 {results['p99_ms']} ms | max {results['max_ms']} ms")
+    print(f"📊 Status codes: {results['statuses']}  Errors: {results['errors'] or 'none'}")
+    if statuses.get(503):
+        print(f"⚠️  {statuses[503]} requests were shed with 503 (server at --max-in-flight)")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the MedSecure AI HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--endpoint", choices=["search", "mask", "embed", "records"], default="search")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=1, help="Texts/records per request for mask, embed and records")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+    
+    results = asyncio.run(run_load_test(args.host, args.port, args.endpoint, args.connections,
+                                        args.duration, args.batch, args.seed))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+    return results
+
+if __name__ == "__main__":
+    main()
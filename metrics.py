@@ -0,0 +1,270 @@
+import bisect
+import cProfile
+import functools
+import io
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Latency bucket upper bounds in seconds (Prometheus convention), +Inf is implicit
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram. Observing is O(log buckets) and allocation-free."""
+    
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+    
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket, like PromQL histogram_quantile"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower  # +Inf bucket: the best we can say is "above the last bound"
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+    
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.50) * 1000, 3),
+            'p95_ms': round(self.quantile(0.95) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3)
+        }
+
+class MetricsRegistry:
+    """Stage latency histograms, counters and gauges with Prometheus text export.
+    
+    Wrap pipeline stages in ``span("stage")`` (or decorate with ``timed("stage")``).
+    Optionally a sampled fraction of spans is run under cProfile and/or measured
+    with tracemalloc; see ``enable_profiling``.
+    """
+    
+    def __init__(self, namespace="medsecure"):
+        self.namespace = namespace
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self.profile_sample_rate = 0.0
+        self.trace_memory = False
+        self._profile_stats = None
+        self._profile_lock = threading.Lock()
+    
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+    
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+    
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def register_gauge(self, name, callback, help_text=""):
+        """Report ``callback()`` as a gauge whenever metrics are read"""
+        with self._lock:
+            self._gauges[name] = (callback, help_text)
+    
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block as one call of ``stage``"""
+        profiler = None
+        if self.profile_sample_rate and random.random() < self.profile_sample_rate:
+            # One profiler at a time; a span that loses the race just isn't sampled
+            if self._profile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:  # another profiler (e.g. a debugger) is active
+                    profiler = None
+                    self._profile_lock.release()
+        traced_before = tracemalloc.get_traced_memory()[0] if self.trace_memory else None
+        
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment("stage_errors_total", stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+            if traced_before is not None and tracemalloc.is_tracing():
+                # Approximate under concurrency: other threads allocate too
+                allocated = tracemalloc.get_traced_memory()[0] - traced_before
+                self.increment("stage_allocated_bytes_total", max(allocated, 0), stage=stage)
+            if profiler is not None:
+                profiler.disable()
+                try:
+                    if self._profile_stats is None:
+                        self._profile_stats = pstats.Stats(profiler)
+                    else:
+                        self._profile_stats.add(profiler)
+                finally:
+                    self._profile_lock.release()
+    
+    def timed(self, stage):
+        """Decorator form of ``span``"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    # ------------------------------------------------------------------
+    # Profiling
+    # ------------------------------------------------------------------
+    def enable_profiling(self, sample_rate=0.01, trace_memory=False):
+        """Profile a random ``sample_rate`` fraction of spans; optionally track allocations"""
+        if self.trace_memory and not trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.profile_sample_rate = sample_rate
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    def disable_profiling(self):
+        self.profile_sample_rate = 0.0
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = False
+    
+    def profile_report(self, limit=20, sort_by="cumulative"):
+        """Top functions from the sampled cProfile runs, as text"""
+        with self._profile_lock:
+            if self._profile_stats is None:
+                return "No profile samples collected yet"
+            output = io.StringIO()
+            self._profile_stats.stream = output
+            self._profile_stats.sort_stats(sort_by).print_stats(limit)
+        return output.getvalue()
+    
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def _gauge_values(self):
+        values = {}
+        for name, (callback, help_text) in list(self._gauges.items()):
+            try:
+                values[name] = (float(callback()), help_text)
+            except Exception:
+                continue  # a broken gauge must not break the metrics page
+        return values
+    
+    def snapshot(self):
+        """Plain-dict view of everything recorded so far"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+        return {
+            'stages': {stage: histogram.summary() for stage, histogram in sorted(histograms.items())},
+            'counters': {_format_key(name, labels): value for (name, labels), value in sorted(counters.items())},
+            'gauges': {name: value for name, (value, _) in self._gauge_values().items()}
+        }
+    
+    def export_prometheus(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        
+        if histograms:
+            lines.append(f"# HELP {ns}_stage_latency_seconds Latency of pipeline stages.")
+            lines.append(f"# TYPE {ns}_stage_latency_seconds histogram")
+        for stage, histogram in histograms:
+            with histogram._lock:
+                counts, total, total_sum = list(histogram.counts), histogram.count, histogram.sum
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{ns}_stage_latency_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{ns}_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {total}')
+            lines.append(f'{ns}_stage_latency_seconds_sum{{stage="{stage}"}} {total_sum:.9g}')
+            lines.append(f'{ns}_stage_latency_seconds_count{{stage="{stage}"}} {total}')
+        
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {ns}_{name} counter")
+            lines.append(f"{ns}_{_format_key(name, labels)} {value:g}")
+        
+        for name, (value, help_text) in sorted(self._gauge_values().items()):
+            if help_text:
+                lines.append(f"# HELP {ns}_{name} {help_text}")
+            lines.append(f"# TYPE {ns}_{name} gauge")
+            lines.append(f"{ns}_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+    
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+        with self._profile_lock:
+            self._profile_stats = None
+
+def _format_key(name, labels):
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels)
+    return f"{name}{{{rendered}}}"
+
+# Process-wide registry shared by the pipeline modules and the app
+METRICS = MetricsRegistry()
+span = METRICS.span
+timed = METRICS.timed
+
+def test_metrics():
+    """Test the metrics registry"""
+    print("🧪 Testing Metrics...")
+    
+    registry = MetricsRegistry()
+    for delay in (0.001, 0.002, 0.005):
+        with registry.span("demo_stage"):
+            time.sleep(delay)
+    registry.increment("records_stored_total", 3)
+    registry.register_gauge("store_bytes", lambda: 1024, "Bytes held by the record store.")
+    
+    print(f"📊 Snapshot: {registry.snapshot()}")
+    print("📈 Prometheus export:")
+    print(registry.export_prometheus())
+
+if __name__ == "__main__":
+    test_metrics()
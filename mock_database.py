@@ -1,103 +1,791 @@
+import bisect
+import heapq
+import json
+import logging
+import sys
+import threading
+import time
 import uuid
+from array import array
 from datetime import datetime
 
+from dedup import NearDuplicateIndex
+from encryption import DEFAULT_CACHE_BLOCKS, EncryptedArena, load_key
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+
+# Fields returned by get_records_list / get_records_page, with defaults for missing metadata
+DISPLAY_FIELDS = {
+    'text': '',
+    'diagnosis': 'N/A',
+    'urgency': 'N/A',
+    'category': 'N/A',
+    'timestamp': 'N/A',
+    'phi_removed': True
+}
+
+# Low-cardinality metadata stored as dictionary-encoded columns instead of per-record values.
+# 'duplicate_of' links a near-duplicate to its canonical record; many links share one code.
+CATEGORICAL_FIELDS = ('urgency', 'category', 'diagnosis', 'phi_removed', 'duplicate_of')
+
+# Metadata keys the store owns; everything else goes into the per-record extras blob
+RESERVED_FIELDS = frozenset(CATEGORICAL_FIELDS) | {'text', 'timestamp'}
+
+# What store_medical_record does with a near-duplicate: store it anyway, drop it, or store it linked
+DEDUP_MODES = (None, 'skip', 'link')
+
+_MISSING = object()
+
+# Size of one UUID int key in the ID -> ordinal map
+_UUID_KEY_BYTES = sys.getsizeof(uuid.UUID(int=(1 << 127) | 1).int)
+
+class _Dictionary:
+    """Dictionary encoding for one categorical column. Code 0 means the key was not set."""
+    
+    def __init__(self):
+        self.values = [_MISSING]
+        self._codes = {}
+    
+    def encode(self, value):
+        # Key on the type too so True and 1 don't share a code
+        key = (type(value), value)
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[key] = code
+        return code
+    
+    def code(self, value):
+        """Existing code for ``value``, or 0 if it was never encoded"""
+        return self._codes.get((type(value), value), 0)
+    
+    def nbytes(self):
+        return (sys.getsizeof(self.values) + sys.getsizeof(self._codes)
+                + sum(sys.getsizeof(value) for value in self.values[1:]))
+
+class _RecordColumns:
+    """Columnar record storage addressed by integer ordinal.
+    
+    IDs are 16-byte UUIDs in one buffer, timestamps are int64 epoch microseconds,
+    categorical metadata is dictionary-encoded, and each record's text plus JSON
+    extras live back to back in a single byte arena indexed by ``offsets``.
+    The arena is a ``bytearray`` or an ``EncryptedArena``, which seals it in
+    AES-GCM blocks. Everything is append-only; dict-shaped records are only built
+    on request.
+    """
+    
+    def __init__(self, dictionaries=None, code_typecodes=None, arena=None):
+        self.dictionaries = dictionaries or {field: _Dictionary() for field in CATEGORICAL_FIELDS}
+        code_typecodes = code_typecodes or {}
+        self.codes = {field: array(code_typecodes.get(field, 'H')) for field in CATEGORICAL_FIELDS}
+        self.uuids = bytearray()
+        self.seqs = array('q')
+        self.timestamps = array('q')
+        self.arena = bytearray() if arena is None else arena
+        self.offsets = array('q', [0])   # record i spans arena[offsets[i]:offsets[i + 1]]
+        self.text_ends = array('q')      # text is arena[offsets[i]:text_ends[i]], extras follow
+    
+    def empty_like(self):
+        """New empty columns sharing this instance's dictionaries and arena encryption"""
+        arena = self.arena.empty_like() if isinstance(self.arena, EncryptedArena) else None
+        return _RecordColumns(self.dictionaries,
+                              {field: codes.typecode for field, codes in self.codes.items()}, arena)
+    
+    def __len__(self):
+        return len(self.seqs)
+    
+    def _append_code(self, field, code):
+        codes = self.codes[field]
+        if code > 0xFFFF and codes.typecode == 'H':
+            codes = self.codes[field] = array('I', codes)
+        codes.append(code)
+    
+    def append(self, uuid_bytes, seq, timestamp_us, text, metadata):
+        extras = {}
+        for key, value in metadata.items():
+            if key in RESERVED_FIELDS:
+                continue
+            extras[key] = value
+        
+        self.uuids += uuid_bytes
+        self.seqs.append(seq)
+        self.timestamps.append(timestamp_us)
+        for field in CATEGORICAL_FIELDS:
+            value = metadata.get(field, _MISSING)
+            code = 0
+            if value is not _MISSING:
+                try:
+                    code = self.dictionaries[field].encode(value)
+                except TypeError:
+                    extras[field] = value  # unhashable, keep it as an extra
+            self._append_code(field, code)
+        
+        # One append per record: an encrypted arena re-seals its last block on each
+        encoded = text.encode('utf-8')
+        self.text_ends.append(len(self.arena) + len(encoded))
+        if extras:
+            encoded += json.dumps(extras, default=str).encode('utf-8')
+        self.arena += encoded
+        self.offsets.append(len(self.arena))
+        return len(self.seqs) - 1
+    
+    def append_from(self, other, ordinal):
+        """Copy one encoded row from ``other`` (which shares our dictionaries) without decoding it"""
+        self.uuids += other.uuids[ordinal * 16:(ordinal + 1) * 16]
+        self.seqs.append(other.seqs[ordinal])
+        self.timestamps.append(other.timestamps[ordinal])
+        for field in CATEGORICAL_FIELDS:
+            self._append_code(field, other.codes[field][ordinal])
+        
+        start = other.offsets[ordinal]
+        base = len(self.arena)
+        self.arena += other.arena[start:other.offsets[ordinal + 1]]
+        self.text_ends.append(base + other.text_ends[ordinal] - start)
+        self.offsets.append(len(self.arena))
+        return len(self.seqs) - 1
+    
+    def uuid_int(self, ordinal):
+        return int.from_bytes(self.uuids[ordinal * 16:(ordinal + 1) * 16], 'big')
+    
+    def record_id(self, ordinal):
+        return str(uuid.UUID(bytes=bytes(self.uuids[ordinal * 16:(ordinal + 1) * 16])))
+    
+    def text(self, ordinal):
+        return self.arena[self.offsets[ordinal]:self.text_ends[ordinal]].decode('utf-8')
+    
+    def iter_texts(self, ordinals):
+        """Yield ``(ordinal, text)`` for each ordinal; cheapest when ordinals ascend.
+        
+        An encrypted arena is read a block at a time, so a scan decrypts (or looks up
+        in the cache) each block once rather than once per record.
+        """
+        offsets, text_ends, arena = self.offsets, self.text_ends, self.arena
+        if not isinstance(arena, EncryptedArena):
+            for ordinal in ordinals:
+                yield ordinal, arena[offsets[ordinal]:text_ends[ordinal]].decode('utf-8')
+            return
+        base, block, end = 0, b"", 0
+        for ordinal in ordinals:
+            start, stop = offsets[ordinal], text_ends[ordinal]
+            if start < base or stop > end:
+                base, block = arena.block_at(start)
+                end = base + len(block)
+                if stop > end:  # spans two blocks
+                    yield ordinal, arena[start:stop].decode('utf-8')
+                    continue
+            yield ordinal, block[start - base:stop - base].decode('utf-8')
+    
+    def timestamp(self, ordinal):
+        micros = self.timestamps[ordinal]
+        return datetime.fromtimestamp(micros // 1_000_000).replace(microsecond=micros % 1_000_000).isoformat()
+    
+    def extras(self, ordinal):
+        start, end = self.text_ends[ordinal], self.offsets[ordinal + 1]
+        return json.loads(self.arena[start:end]) if end > start else {}
+    
+    def field(self, ordinal, name, default=None):
+        """Decode a single metadata field without materializing the whole record"""
+        if name == 'text':
+            return self.text(ordinal)
+        if name == 'timestamp':
+            return self.timestamp(ordinal)
+        if name in self.codes:
+            code = self.codes[name][ordinal]
+            if code:
+                return self.dictionaries[name].values[code]
+        return self.extras(ordinal).get(name, default)
+    
+    def metadata(self, ordinal, with_text=True):
+        """Materialize the dict-shaped metadata for one record"""
+        metadata = {}
+        for field in CATEGORICAL_FIELDS:
+            code = self.codes[field][ordinal]
+            if code:
+                metadata[field] = self.dictionaries[field].values[code]
+        metadata.update(self.extras(ordinal))
+        metadata['timestamp'] = self.timestamp(ordinal)
+        if with_text:
+            metadata['text'] = self.text(ordinal)
+        return metadata
+    
+    def nbytes(self):
+        """Bytes held by the columns themselves (dictionaries are shared and counted separately)"""
+        return sum(sys.getsizeof(column) for column in (
+            self.uuids, self.seqs, self.timestamps, self.arena, self.offsets, self.text_ends,
+            *self.codes.values()
+        ))
+
+class _Snapshot:
+    """Immutable view of the store that readers use without taking the lock.
+    
+    Columns are append-only, so rows below ``count`` never change underneath a
+    reader; deletes publish a fresh copy of the tombstone bitmap instead of
+    mutating the one a reader may be holding. ``orphaned_links`` holds the
+    'duplicate_of' codes whose canonical record has since been deleted or corrected.
+    The first ``order_count`` entries of ``order_seqs``/``order_slots`` list every
+    record's creation sequence and current slot in creation (timestamp) order.
+    """
+    
+    __slots__ = ('columns', 'count', 'tombstones', 'live_count', 'orphaned_links',
+                 'order_seqs', 'order_slots', 'order_count')
+    
+    def __init__(self, columns, count, tombstones, live_count, orphaned_links=frozenset(),
+                 order_seqs=(), order_slots=(), order_count=0):
+        self.columns = columns
+        self.count = count
+        self.tombstones = tombstones
+        self.live_count = live_count
+        self.orphaned_links = orphaned_links
+        self.order_seqs = order_seqs
+        self.order_slots = order_slots
+        self.order_count = order_count
+    
+    def is_deleted(self, slot):
+        byte = slot >> 3
+        # Rows appended after the bitmap was copied are live
+        return byte < len(self.tombstones) and self.tombstones[byte] & (1 << (slot & 7))
+    
+    def live_slots(self):
+        return (slot for slot in range(self.count) if not self.is_deleted(slot))
+
+def _now_micros():
+    return time.time_ns() // 1000
+
+def _parse_record_id(record_id):
+    try:
+        return uuid.UUID(record_id).int
+    except (ValueError, TypeError, AttributeError):
+        return None
+
 class MockMedicalVectorDB:
-    """Mock database that simulates vector search without external dependencies"""
+    """Mock database that simulates vector search without external dependencies
+    
+    Safe to share between threads (e.g. every Streamlit session via
+    ``st.cache_resource``). Writers serialize on a lock, append to the columns and
+    atomically publish a new ``_Snapshot``; readers grab the current snapshot and
+    never block or see a half-written record.
+    
+    With ``dedup`` set, each new record's MinHash signature is looked up in an
+    LSH index of canonical records. A match at ``dedup_threshold`` estimated
+    Jaccard similarity or above is either dropped ("skip", the canonical ID is
+    returned) or stored with ``duplicate_of`` set ("link") and left out of search
+    while its canonical record is live.
+    
+    Record text and extra metadata are encrypted at rest (``encrypt=True``) with
+    AES-GCM from the first record on. Blocks are decrypted lazily on reads into
+    a cache of at most ``decrypted_cache_blocks`` blocks. The key comes from ``encryption_key``, the
+    MEDSECURE_DB_KEY environment variable, or is generated per process.
+    """
+    
+    # Compact once this fraction of stored slots are tombstones
+    COMPACTION_THRESHOLD = 0.3
+    # Don't bother compacting tiny stores
+    COMPACTION_MIN_RECORDS = 64
     
-    def __init__(self, persist_directory=None):
+    def __init__(self, persist_directory=None, compaction_threshold=None, dedup=None, dedup_threshold=0.85,
+                 encrypt=True, encryption_key=None, decrypted_cache_blocks=DEFAULT_CACHE_BLOCKS):
         print("🔄 Initializing Mock Medical Database...")
-        self.records = {}
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"dedup must be one of {DEDUP_MODES}, got {dedup!r}")
         self.collection_name = "medical_records"
+        self.compaction_threshold = (
+            self.COMPACTION_THRESHOLD if compaction_threshold is None else compaction_threshold
+        )
+        self.dedup = dedup
+        self._dedup_index = NearDuplicateIndex(dedup_threshold) if dedup else None
+        self._encryption_key = load_key(encryption_key) if encrypt else None
+        self.decrypted_cache_blocks = decrypted_cache_blocks
+        self._lock = threading.RLock()
+        self._compaction_thread = None
+        self._compaction_lock = threading.Lock()   # one compaction at a time
+        self.last_compaction = None
+        self._generation = 0         # bumped on reset so a running compaction is discarded
+        self._init_storage()
         print("✅ Mock database initialized (no external dependencies required)")
     
+    def _init_storage(self):
+        """Create empty columnar storage. Slots are append-only; deletes only set a tombstone bit."""
+        arena = None
+        if self._encryption_key is not None:
+            arena = EncryptedArena(self._encryption_key, cache_blocks=self.decrypted_cache_blocks)
+        self._columns = _RecordColumns(arena=arena)
+        self._ordinals = {}          # UUID int -> live slot
+        self._next_seq = 0           # creation sequence, strictly increasing; kept by updates, used as cursor
+        # Creation order: sorted creation seqs and the current slot of each record. Appends
+        # extend both in place; moving a record to a new slot replaces order_slots.
+        self._order_seqs = array('q')
+        self._order_slots = array('q')
+        self._tombstones = bytearray()
+        self._deleted_count = 0
+        self._compacting_upto = None
+        self._deleted_during_compaction = set()
+        self._orphaned_links = frozenset()
+        self._dedup_checked = 0
+        self._dedup_duplicates = 0
+        if self._dedup_index is not None:
+            self._dedup_index.clear()
+        self._publish(tombstones_changed=True)
+    
+    def _publish(self, tombstones_changed=False):
+        """Make the current writer state visible to readers. Call with the lock held."""
+        tombstones = bytes(self._tombstones) if tombstones_changed else self._snapshot.tombstones
+        self._snapshot = _Snapshot(self._columns, len(self._columns), tombstones, len(self._ordinals),
+                                   self._orphaned_links, self._order_seqs, self._order_slots,
+                                   len(self._order_seqs))
+    
+    # ------------------------------------------------------------------
+    # Tombstone bitmap helpers
+    # ------------------------------------------------------------------
+    
+    def _register_slot(self, slot):
+        if slot >> 3 >= len(self._tombstones):
+            self._tombstones.append(0)
+        self._ordinals[self._columns.uuid_int(slot)] = slot
+        seq = self._columns.seqs[slot]
+        order_seqs = self._order_seqs
+        if not order_seqs or seq > order_seqs[-1]:
+            order_seqs.append(seq)
+            self._order_slots.append(slot)
+        else:
+            # A corrected record keeps its place; copy so readers keep a consistent order
+            position = bisect.bisect_left(order_seqs, seq)
+            order_slots = array('q', self._order_slots)
+            order_slots[position] = slot
+            self._order_slots = order_slots
+        return slot
+    
+    def _append_slot(self, uuid_bytes, text, metadata, timestamp_us=None, seq=None):
+        if seq is None:
+            seq = self._next_seq
+            self._next_seq += 1
+        slot = self._columns.append(uuid_bytes, seq, timestamp_us or _now_micros(), text, metadata)
+        return self._register_slot(slot)
+    
+    def _tombstone(self, slot):
+        self._tombstones[slot >> 3] |= 1 << (slot & 7)
+        self._deleted_count += 1
+        if self._compacting_upto is not None and slot < self._compacting_upto:
+            self._deleted_during_compaction.add(slot)
+    
+    def _lookup(self, record_id):
+        key = _parse_record_id(record_id)
+        return None if key is None else self._ordinals.get(key)
+    
+    @property
+    def records(self):
+        """Snapshot of live records keyed by record ID"""
+        snapshot = self._snapshot
+        columns = snapshot.columns
+        return {columns.record_id(slot): columns.metadata(slot) for slot in snapshot.live_slots()}
+    
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
     def store_medical_record(self, medical_text, metadata=None):
-        """Store medical record in mock database"""
+        """Store medical record in mock database.
+        
+        Returns the new record's ID, or with ``dedup="skip"`` the ID of the
+        canonical record a near-duplicate was folded into.
+        """
+        return self.ingest_medical_record(medical_text, metadata)[0]
+    
+    @METRICS.timed("store_medical_record")
+    def ingest_medical_record(self, medical_text, metadata=None):
+        """Like ``store_medical_record``, but returns ``(record_id, stored)``.
+        
+        ``stored`` is False when ``dedup="skip"`` dropped the record as a
+        near-duplicate and ``record_id`` is that of its canonical record.
+        """
         if metadata is None:
             metadata = {}
         
-        record_id = str(uuid.uuid4())
+        record_uuid = uuid.uuid4()
+        record_id = str(record_uuid)
         
         full_metadata = {
             **metadata,
-            'timestamp': datetime.now().isoformat(),
-            'phi_removed': True,
-            'text': medical_text
+            'phi_removed': True
         }
+        full_metadata.pop('duplicate_of', None)  # store-owned: only set from a dedup match below
+        
+        signature = None
+        if self._dedup_index is not None:
+            with METRICS.span("dedup_signature"):
+                signature = self._dedup_index.signature(medical_text)
         
-        self.records[record_id] = full_metadata
-        print(f"✅ Mock stored record with ID: {record_id}")
-        print(f"   Text: {medical_text}")
-        return record_id
+        with self._lock:
+            # Look up and index under the lock so concurrent copies can't both become canonical
+            match = None
+            if signature is not None:
+                self._dedup_checked += 1
+                match = self._dedup_index.query(signature)
+            if match is not None:
+                self._dedup_duplicates += 1
+                canonical_id = str(uuid.UUID(int=match[0]))
+                if self.dedup == 'skip':
+                    METRICS.increment("records_deduplicated_total", mode='skip')
+                    logger.debug("♻️ Mock skipped near-duplicate of %s (similarity %.2f)", canonical_id, match[1])
+                    return canonical_id, False
+                full_metadata['duplicate_of'] = canonical_id
+            self._append_slot(record_uuid.bytes, medical_text, full_metadata)
+            if signature is not None and match is None:
+                self._dedup_index.add(record_uuid.int, signature)
+            self._publish()
+        if match is not None:
+            METRICS.increment("records_deduplicated_total", mode='link')
+        METRICS.increment("records_stored_total")
+        logger.debug("✅ Mock stored record with ID: %s", record_id)
+        return record_id, True
+    
+    def delete_medical_record(self, record_id):
+        """Delete a single record by ID. Returns False if the ID is unknown."""
+        with self._lock:
+            key = _parse_record_id(record_id)
+            slot = None if key is None else self._ordinals.pop(key, None)
+            if slot is None:
+                return False
+            self._tombstone(slot)
+            if self._dedup_index is not None and self._dedup_index.remove(key):
+                self._orphan_links_to(str(uuid.UUID(int=key)))
+            self._publish(tombstones_changed=True)
+        METRICS.increment("records_deleted_total")
+        logger.debug("🗑️ Mock deleted record with ID: %s", record_id)
+        self._maybe_schedule_compaction()
+        return True
+    
+    def update_medical_record(self, record_id, medical_text=None, metadata=None):
+        """Correct a record in place of its ID.
+        
+        The old version is tombstoned and the new one appended under the same ID,
+        so existing slots never change and search keeps working while we write.
+        The record keeps its original ``timestamp`` (when it was added) and with
+        it its place in ``get_records_page`` order. With
+        deduplication on, corrected text is checked for near-duplicates again.
+        Returns False if the ID is unknown.
+        """
+        signature = None
+        if self._dedup_index is not None and medical_text is not None:
+            signature = self._dedup_index.signature(medical_text)
+        metadata = {k: v for k, v in (metadata or {}).items() if k != 'duplicate_of'}
+        
+        with self._lock:
+            slot = self._lookup(record_id)
+            if slot is None:
+                return False
+            
+            columns = self._columns
+            full_metadata = {**columns.metadata(slot, with_text=False), **metadata}
+            text_changed = medical_text is not None and medical_text != columns.text(slot)
+            if medical_text is None:
+                medical_text = columns.text(slot)
+            uuid_bytes = bytes(columns.uuids[slot * 16:(slot + 1) * 16])
+            if text_changed and self._dedup_index is not None:
+                self._redetect_duplicate(columns.uuid_int(slot), signature, full_metadata)
+            
+            self._tombstone(slot)
+            self._append_slot(uuid_bytes, medical_text, full_metadata, columns.timestamps[slot],
+                              columns.seqs[slot])
+            self._publish(tombstones_changed=True)
+        METRICS.increment("records_updated_total")
+        logger.debug("✏️ Mock updated record with ID: %s", record_id)
+        self._maybe_schedule_compaction()
+        return True
+    
+    # ------------------------------------------------------------------
+    # Near-duplicate detection
+    # ------------------------------------------------------------------
+    def _redetect_duplicate(self, key, signature, metadata):
+        """Re-run near-duplicate detection for a record whose text was corrected.
+        
+        Drops its old link (or, for a canonical record, orphans the links to it)
+        and links or indexes it by its new text. Call with the lock held.
+        """
+        record_id = str(uuid.UUID(int=key))
+        metadata.pop('duplicate_of', None)
+        if self._dedup_index.remove(key):
+            # Copies of the old text no longer have a searchable original
+            self._orphan_links_to(record_id)
+        match = self._dedup_index.query(signature)
+        if match is not None:
+            # In skip mode the record is kept as corrected but not indexed: its match already is
+            if self.dedup == 'link':
+                metadata['duplicate_of'] = str(uuid.UUID(int=match[0]))
+        elif signature is not None and not self._columns.dictionaries['duplicate_of'].code(record_id):
+            # An ID with orphaned links can't take new ones without hiding those copies again
+            self._dedup_index.add(key, signature)
+    
+    def _orphan_links_to(self, canonical_id):
+        """Let records linked to a deleted or corrected canonical record show up in search again"""
+        code = self._columns.dictionaries['duplicate_of'].code(canonical_id)
+        if code:
+            self._orphaned_links = self._orphaned_links | {code}
+    
+    def dedup_ratio(self):
+        """Fraction of deduplication-checked records that were near-duplicates"""
+        checked = self._dedup_checked
+        return self._dedup_duplicates / checked if checked else 0.0
+    
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    def tombstone_ratio(self):
+        """Fraction of stored slots that are tombstones"""
+        total = len(self._columns)
+        return self._deleted_count / total if total else 0.0
+    
+    def _maybe_schedule_compaction(self):
+        with self._lock:
+            if len(self._columns) < self.COMPACTION_MIN_RECORDS:
+                return
+            if self.tombstone_ratio() < self.compaction_threshold:
+                return
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(
+                target=self.compact, name="medical-db-compaction", daemon=True
+            )
+            self._compaction_thread.start()
     
+    def wait_for_compaction(self, timeout=None):
+        """Block until a background compaction (if any) has finished"""
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join(timeout)
+    
+    def _storage_nbytes(self):
+        nbytes = (self._columns.nbytes() + sys.getsizeof(self._tombstones)
+                  + sys.getsizeof(self._ordinals) + _UUID_KEY_BYTES * len(self._ordinals)
+                  + sys.getsizeof(self._order_seqs) + sys.getsizeof(self._order_slots))
+        if self._dedup_index is not None:
+            nbytes += self._dedup_index.nbytes()
+        return nbytes
+    
+    def compact(self):
+        """Rewrite live records into dense storage and drop tombstones.
+        
+        The copy runs outside the lock; only the final swap blocks writers.
+        A compaction already running (say in the background) is waited for first.
+        Returns a stats dict (also kept on ``self.last_compaction``).
+        """
+        with self._compaction_lock:
+            return self._compact()
+    
+    def _compact(self):
+        started = time.perf_counter()
+        with self._lock:
+            old = self._columns
+            upto = len(old)
+            generation = self._generation
+            tombstones = bytes(self._tombstones)
+            old_nbytes = self._storage_nbytes()
+            self._compacting_upto = upto
+            self._deleted_during_compaction = set()
+        
+        # Rows below ``upto`` are never mutated, so this is safe without the lock
+        live_slots = [s for s in range(upto) if not tombstones[s >> 3] & (1 << (s & 7))]
+        new = old.empty_like()
+        for slot in live_slots:
+            new.append_from(old, slot)
+        new_ordinals = {new.uuid_int(slot): slot for slot in range(len(new))}
+        new_tombstones = bytearray((len(new) + 7) >> 3)
+        # Corrected records sit out of creation order; slots are nearly sorted, so this is cheap
+        order = sorted(range(len(new)), key=new.seqs.__getitem__)
+        new_order_seqs = array('q', (new.seqs[slot] for slot in order))
+        new_order_slots = array('q', order)
+        
+        with self._lock:
+            self._compacting_upto = None
+            if generation != self._generation or self._columns is not old:
+                return None  # database was reset or compacted underneath us
+            
+            old_tombstones = self._tombstones
+            self._columns, self._ordinals, self._tombstones = new, new_ordinals, new_tombstones
+            self._order_seqs, self._order_slots = new_order_seqs, new_order_slots
+            self._deleted_count = 0
+            # Records deleted or updated while we were copying
+            for slot in sorted(self._deleted_during_compaction):
+                new_slot = bisect.bisect_left(live_slots, slot)
+                key = new.uuid_int(new_slot)
+                if new_ordinals.get(key) == new_slot:
+                    del new_ordinals[key]
+                self._tombstone(new_slot)
+            self._deleted_during_compaction = set()
+            # Records written while we were copying
+            for slot in range(upto, len(old)):
+                new_slot = self._register_slot(new.append_from(old, slot))
+                if old_tombstones[slot >> 3] & (1 << (slot & 7)):
+                    del new_ordinals[new.uuid_int(new_slot)]
+                    self._tombstone(new_slot)
+            
+            self._publish(tombstones_changed=True)
+            
+            reclaimed = max(old_nbytes - self._storage_nbytes(), 0)
+            self.last_compaction = {
+                'removed_records': upto - len(live_slots),
+                'live_records': len(self._ordinals),
+                'reclaimed_bytes': reclaimed,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                'timestamp': datetime.now().isoformat()
+            }
+        METRICS.observe("compact", time.perf_counter() - started)
+        logger.info("🧹 Compaction removed %d records, reclaimed ~%d bytes",
+                    self.last_compaction['removed_records'], reclaimed)
+        return self.last_compaction
+    
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @METRICS.timed("search_similar_cases")
     def search_similar_cases(self, query_text, top_k=5, filters=None):
         """Mock similarity search based on keyword matching"""
-        print(f"🔍 Mock searching for: '{query_text}'")
         
         # Simple keyword-based "similarity" search
         query_words = query_text.lower().split()
-        matches = []
         
-        for record_id, metadata in self.records.items():
-            text = metadata.get('text', '').lower()
-            score = sum(1 for word in query_words if word in text)
-            
-            if score > 0:
-                matches.append((score, metadata))
+        snapshot = self._snapshot
+        columns = snapshot.columns
+        links = columns.codes['duplicate_of'] if self.dedup == 'link' else None
+        orphaned = snapshot.orphaned_links
         
-        # Sort by match score and take top_k
-        matches.sort(key=lambda x: x[0], reverse=True)
-        top_matches = matches[:top_k]
+        slots = snapshot.live_slots()
+        if links is not None:
+            # Linked near-duplicates would only crowd their canonical record out of the top-k
+            slots = (slot for slot in slots if not links[slot] or links[slot] in orphaned)
         
-        # Format results to match ChromaDB format
-        documents = [match[1]['text'] for match in top_matches]
-        metadatas = [{k: v for k, v in match[1].items() if k != 'text'} for match in top_matches]
+        def scored():
+            # Slots ascend, so an encrypted arena decrypts each block at most once per search
+            for slot, text in columns.iter_texts(slots):
+                text = text.lower()
+                score = sum(1 for word in query_words if word in text)
+                if score > 0:
+                    yield score, slot
         
-        print(f"✅ Mock found {len(documents)} similar cases")
+        # Best scores first; ties keep insertion order like a stable sort would
+        top_matches = heapq.nlargest(top_k, scored(), key=lambda match: match[0])
+        
+        # Only the winners are turned back into dicts
+        documents = [columns.text(slot) for _, slot in top_matches]
+        metadatas = [columns.metadata(slot, with_text=False) for _, slot in top_matches]
+        
+        # Format results to match ChromaDB format
+        logger.debug("✅ Mock found %d similar cases", len(documents))
         return {'documents': [documents], 'metadatas': [metadatas]}
     
     def get_collection_info(self):
         """Get mock collection info"""
+        snapshot = self._snapshot
+        deleted = snapshot.count - snapshot.live_count
+        arena = snapshot.columns.arena
         return {
-            'total_records': len(self.records),
+            'total_records': snapshot.live_count,
             'collection_name': self.collection_name,
-            'status': 'mock_database_active'
+            'status': 'mock_database_active',
+            'deleted_records': deleted,
+            'tombstone_ratio': round(deleted / snapshot.count, 4) if snapshot.count else 0.0,
+            'storage_bytes': self._storage_nbytes() + sum(
+                dictionary.nbytes() for dictionary in snapshot.columns.dictionaries.values()
+            ),
+            'last_compaction': self.last_compaction,
+            'dedup_mode': self.dedup,
+            'duplicates_detected': self._dedup_duplicates,
+            'dedup_ratio': round(self.dedup_ratio(), 4),
+            'dedup_index_bytes': self._dedup_index.nbytes() if self._dedup_index is not None else 0,
+            'encrypted': self._encryption_key is not None,
+            'encryption': arena.stats() if isinstance(arena, EncryptedArena) else None
         }
     
     def reset_database(self):
         """Reset the database (for testing)"""
-        self.records = {}
+        with self._lock:
+            self._init_storage()
+            self._generation += 1
         print("✅ Mock database reset complete")
     
     def get_all_records(self):
         """Get all records from the database for viewing"""
-        print(f"📊 Retrieving all {len(self.records)} records...")
-        return self.records
+        records = self.records
+        print(f"📊 Retrieving all {len(records)} records...")
+        return records
     
     def get_records_list(self):
         """Get records in a format suitable for display"""
-        records_list = []
-        for record_id, metadata in self.records.items():
-            records_list.append({
-                'id': record_id,
-                'text': metadata.get('text', ''),
-                'diagnosis': metadata.get('diagnosis', 'N/A'),
-                'urgency': metadata.get('urgency', 'N/A'),
-                'category': metadata.get('category', 'N/A'),
-                'timestamp': metadata.get('timestamp', 'N/A'),
-                'phi_removed': metadata.get('phi_removed', True)
-            })
-        return records_list
+        return list(self.iter_records())
+    
+    def get_records_page(self, cursor=None, limit=DEFAULT_PAGE_SIZE, order="asc", fields=None):
+        """Get one page of records in display format.
+        
+        ``cursor`` is the ``next_cursor`` of the previous page (None for the first page),
+        ``order`` is "asc" (oldest first) or "desc" (newest first) by timestamp (when the
+        record was added; a corrected record keeps its place), and
+        ``fields`` optionally limits which display fields are returned. Cost depends on
+        ``limit``, not on the size of the store.
+        """
+        if order not in ("asc", "desc"):
+            raise ValueError(f"order must be 'asc' or 'desc', got {order!r}")
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        
+        records = []
+        next_cursor = None
+        snapshot = self._snapshot
+        columns = snapshot.columns
+        # Walk the creation-order index; a cursor is the creation sequence of the last
+        # record returned, which neither updates nor compaction change.
+        order_seqs, order_slots, count = snapshot.order_seqs, snapshot.order_slots, snapshot.order_count
+        if order == "asc":
+            start = 0 if cursor is None else bisect.bisect_right(order_seqs, int(cursor), 0, count)
+            positions = range(start, count)
+        else:
+            end = count if cursor is None else bisect.bisect_left(order_seqs, int(cursor), 0, count)
+            positions = range(end - 1, -1, -1)
+        
+        for position in positions:
+            slot = order_slots[position]
+            if snapshot.is_deleted(slot):
+                continue
+            if len(records) == limit:
+                next_cursor = str(last_seq)
+                break
+            records.append(_display_record(columns, slot, fields))
+            last_seq = order_seqs[position]
+        
+        return {'records': records, 'next_cursor': next_cursor}
+    
+    def iter_records(self, page_size=DEFAULT_PAGE_SIZE, order="asc", fields=None):
+        """Iterate over all records in display format, one page at a time"""
+        cursor = None
+        while True:
+            page = self.get_records_page(cursor, page_size, order, fields)
+            yield from page['records']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
     
     def show_database_contents(self):
         """Simple method to display database contents"""
-        if not self.records:
+        records = self.records
+        if not records:
             return "Database is empty"
         
-        result = f"Database has {len(self.records)} records:\n"
-        for record_id, metadata in self.records.items():
+        result = f"Database has {len(records)} records:\n"
+        for record_id, metadata in records.items():
             result += f"\n🔹 {record_id[:8]}...: {metadata.get('text', 'No text')}\n"
         return result
 
+def _display_record(columns, slot, fields=None):
+    """Build the display dict for one record, decoding only the requested ``fields``"""
+    if fields is None:
+        fields = DISPLAY_FIELDS
+    record = {'id': columns.record_id(slot)}
+    for field in fields:
+        if field != 'id':
+            record[field] = columns.field(slot, field, DISPLAY_FIELDS.get(field, 'N/A'))
+    return record
+
 def test_mock_database():
     """Test the mock database"""
     print("🧪 Testing Mock Database...")
@@ -129,6 +817,13 @@ def test_mock_database():
     for record_id, metadata in all_records.items():
         print(f"  {record_id}: {metadata.get('text')}")
     
+    # Test delete / update
+    first_id, second_id = list(all_records)[:2]
+    db.delete_medical_record(first_id)
+    db.update_medical_record(second_id, "Cough and sore throat for 5 days", {"urgency": "medium"})
+    print(f"📊 After delete/update: {db.get_collection_info()}")
+    print(f"🧹 Compaction: {db.compact()}")
+    
     print("✅ Mock database test completed!")
 
 if __name__ == "__main__":
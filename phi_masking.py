@@ -1,16 +1,20 @@
+import logging
 import re
 from datetime import datetime
 
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
 class PHIMasker:
     def __init__(self):
         print("✅ PHI Masker initialized - Simple Version")
     
+    @METRICS.timed("mask_phi")
     def mask_phi(self, text):
         """Remove personally identifiable information from medical text"""
         if not text:
             return text
-            
-        print(f"🔍 Original text: {text}")
         
         # Enhanced rule-based patterns for common PHI
         patterns = {
@@ -29,7 +33,7 @@ class PHIMasker:
         for entity_type, pattern in patterns.items():
             masked_text = re.sub(pattern, f'[{entity_type}_REDACTED]', masked_text)
         
-        print(f"🔒 Masked text: {masked_text}")
+        logger.debug("🔒 Masked %d characters of text", len(text))
         return masked_text
 
 def test_phi_masking():
@@ -49,6 +53,8 @@ def test_phi_masking():
     for i, test_text in enumerate(test_cases, 1):
         print(f"\n--- Test Case {i} ---")
         result = masker.mask_phi(test_text)
+        print(f"🔍 Original text: {test_text}")
+        print(f"🔒 Masked text: {result}")
         print(f"✅ PHI removed successfully")
 
 if __name__ == "__main__":
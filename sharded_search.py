@@ -0,0 +1,211 @@
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Each worker owns one core; stop BLAS from spawning its own thread pool on top
+_SINGLE_THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+def _local_top_k(vectors, queries, top_k):
+    """Top-k rows of ``vectors`` by dot product for each query. Returns (indices, scores)."""
+    scores = queries @ vectors.T
+    k = min(top_k, vectors.shape[0])
+    if k == 0:
+        empty = np.empty((len(queries), 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    if k < vectors.shape[0]:
+        candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+    else:
+        candidates = np.broadcast_to(np.arange(vectors.shape[0]), (len(queries), k))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+def _shard_worker(shm_name, shape, start, end, connection):
+    """Worker loop: attach to the shared matrix, answer top-k queries for rows [start, end)"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        shard = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)[start:end]
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            queries, top_k = message
+            try:
+                indices, scores = _local_top_k(shard, queries, top_k)
+                connection.send((indices + start, scores))
+            except Exception as e:
+                connection.send(e)
+        del shard
+    finally:
+        shm.close()
+        connection.close()
+
+class ShardedVectorIndex:
+    """Cosine-similarity index split across worker processes.
+    
+    The vector matrix lives in one ``multiprocessing.shared_memory`` block; each
+    worker maps its contiguous row range without copying, computes a local top-k
+    and the coordinator merges the partial results. Searches may come from
+    several threads; each round trip to the workers runs under a lock.
+    
+    Usage::
+        
+        with ShardedVectorIndex.from_vectors(embeddings, labels=record_ids, workers=4) as index:
+            index.search(query_embedding, top_k=5)   # [(record_id, score), ...]
+    """
+    
+    def __init__(self, num_vectors, dim, labels=None):
+        if labels is not None and len(labels) != num_vectors:
+            raise ValueError("labels must have one entry per vector")
+        self.shape = (num_vectors, dim)
+        self.labels = labels
+        self._shm = shared_memory.SharedMemory(create=True, size=max(num_vectors * dim * 4, 1))
+        # Fill this view directly to avoid holding a second copy of the matrix
+        self.vectors = np.ndarray(self.shape, dtype=np.float32, buffer=self._shm.buf)
+        self._workers = []
+        self._connections = []
+        self._lock = threading.Lock()   # one send/receive round trip on the pipes at a time
+    
+    @classmethod
+    def from_vectors(cls, vectors, labels=None, workers=None, chunk_rows=65536):
+        """Copy ``vectors`` into shared memory (once, normalized) and start the workers"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = cls(vectors.shape[0], vectors.shape[1], labels)
+        for start in range(0, vectors.shape[0], chunk_rows):
+            index.vectors[start:start + chunk_rows] = vectors[start:start + chunk_rows]
+        index.normalize(chunk_rows)
+        index.start(workers)
+        return index
+    
+    def normalize(self, chunk_rows=65536):
+        """L2-normalize the stored vectors in place so dot product equals cosine similarity"""
+        for start in range(0, self.shape[0], chunk_rows):
+            chunk = self.vectors[start:start + chunk_rows]
+            norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+            np.divide(chunk, norms, out=chunk, where=norms > 0)
+    
+    @property
+    def num_workers(self):
+        return len(self._workers)
+    
+    def start(self, workers=None):
+        """Start one worker process per shard (default: one per CPU core)"""
+        if self._workers:
+            raise RuntimeError("Workers already running; call stop() first")
+        workers = max(1, min(workers or os.cpu_count() or 1, self.shape[0] or 1))
+        bounds = np.linspace(0, self.shape[0], workers + 1).astype(int)
+        
+        # Spawn (not fork) so workers start clean on every platform and pick up the env below
+        context = multiprocessing.get_context("spawn")
+        saved_env = {name: os.environ.get(name) for name in _SINGLE_THREAD_ENV}
+        os.environ.update({name: "1" for name in _SINGLE_THREAD_ENV})
+        try:
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                parent_end, child_end = context.Pipe()
+                process = context.Process(
+                    target=_shard_worker,
+                    args=(self._shm.name, self.shape, int(start), int(end), child_end),
+                    daemon=True
+                )
+                process.start()
+                child_end.close()
+                self._workers.append(process)
+                self._connections.append(parent_end)
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        print(f"✅ Sharded index ready: {self.shape[0]:,} vectors across {workers} workers")
+    
+    def stop(self):
+        """Stop the worker processes (the shared matrix is kept)"""
+        with self._lock:
+            for connection in self._connections:
+                try:
+                    connection.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for process in self._workers:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            for connection in self._connections:
+                connection.close()
+            self._workers, self._connections = [], []
+    
+    def close(self):
+        """Stop the workers and release the shared memory block"""
+        self.stop()
+        self.vectors = None
+        self._shm.close()
+        self._shm.unlink()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def search_batch(self, queries, top_k=5):
+        """Top-k (label, score) pairs for each row of ``queries``. Thread-safe."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+        
+        # Fan the batch out to every shard, then merge the local top-k lists. Replies
+        # carry no request ID, so another thread's send must not interleave with ours.
+        with self._lock:
+            if not self._workers:
+                raise RuntimeError("Index has no running workers; call start() first")
+            for connection in self._connections:
+                connection.send((queries, top_k))
+            partials = [connection.recv() for connection in self._connections]
+        for partial in partials:
+            if isinstance(partial, Exception):
+                raise RuntimeError(f"Shard worker failed: {partial!r}")
+        
+        indices = np.concatenate([partial[0] for partial in partials], axis=1)
+        scores = np.concatenate([partial[1] for partial in partials], axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        indices = np.take_along_axis(indices, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        
+        labels = self.labels
+        return [
+            [(labels[i] if labels is not None else int(i), float(score)) for i, score in zip(row_ids, row_scores)]
+            for row_ids, row_scores in zip(indices, scores)
+        ]
+    
+    def search(self, query, top_k=5):
+        """Top-k (label, score) pairs for a single query vector"""
+        return self.search_batch(query, top_k)[0]
+
+def test_sharded_search():
+    """Test the sharded index against a brute-force search"""
+    print("🧪 Testing Sharded Vector Search...")
+    
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((10_000, 64)).astype(np.float32)
+    queries = rng.standard_normal((5, 64)).astype(np.float32)
+    
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected, _ = _local_top_k(normalized, queries / np.linalg.norm(queries, axis=1, keepdims=True), 5)
+    
+    with ShardedVectorIndex.from_vectors(vectors, workers=4) as index:
+        results = index.search_batch(queries, top_k=5)
+    
+    for i, result in enumerate(results):
+        ids = [label for label, _ in result]
+        print(f"  Query {i+1}: {ids}")
+        if ids == expected[i].tolist():
+            print("✅ Sharded search test PASSED")
+        else:
+            print("❌ Sharded search test FAILED")
+
+if __name__ == "__main__":
+    test_sharded_search()
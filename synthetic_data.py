@@ -0,0 +1,180 @@
+import random
+from collections import deque
+from itertools import islice
+
+# Conditions grouped by the urgency triage.py would assign. The first symptom of
+# every high and medium condition is one of its keywords and is always presented,
+# so triage of a generated note agrees with its urgency metadata.
+CONDITIONS = {
+    "high": [
+        ("Cardiac", ["chest pain", "shortness of breath", "sweating", "left arm numbness"]),
+        ("Stroke", ["stroke symptoms", "facial droop", "slurred speech", "sudden weakness"]),
+        ("Seizure", ["seizure", "confusion", "loss of consciousness"]),
+        ("Hemorrhage", ["severe bleeding", "dizziness", "pale skin"]),
+        ("Anaphylaxis", ["choking", "throat swelling", "hives"]),
+    ],
+    "medium": [
+        ("Appendicitis", ["abdominal pain", "nausea", "loss of appetite"]),
+        ("Influenza", ["high fever", "body aches", "chills"]),
+        ("Concussion", ["head injury", "headache", "blurred vision"]),
+        ("Fracture", ["broken bone", "swelling", "bruising"]),
+        ("Migraine", ["severe headache", "sensitivity to light", "nausea"]),
+    ],
+    "low": [
+        ("Common Cold", ["cough", "sore throat", "runny nose"]),
+        ("Hypertension", ["high blood pressure", "mild headache"]),
+        ("Diabetes", ["increased thirst", "frequent urination", "fatigue"]),
+        ("Allergic Rhinitis", ["sneezing", "itchy eyes", "congestion"]),
+        ("Back Strain", ["lower back pain", "stiffness"]),
+    ],
+}
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "Maria", "Ahmed", "Wei", "Priya", "Carlos", "Fatima"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Martinez", "Lopez", "Wilson", "Anderson", "Patel", "Chen", "Khan", "Nguyen"]
+STREETS = ["Main Street", "Oak Avenue", "Maple Drive", "Cedar Lane", "Park Road", "Elm Court"]
+CITIES = [("Springfield", "IL"), ("Riverside", "CA"), ("Franklin", "TN"), ("Madison", "WI"),
+          ("Georgetown", "TX"), ("Salem", "OR")]
+EMAIL_DOMAINS = ["hospital.com", "clinic.org", "mail.com", "health.net"]
+MEDICATIONS = ["aspirin", "metformin", "lisinopril", "warfarin", "ibuprofen", "atorvastatin",
+               "albuterol", "amoxicillin", "calcium", "vitamin c"]
+URGENCY_LEVELS = ("high", "medium", "low")
+
+# Every PHI type PHIMasker.mask_phi targets, each rendered the way its pattern expects
+PHI_TYPES = ("patient_name", "doctor_name", "ssn", "phone", "email", "date",
+             "medical_record", "address", "name_standalone")
+
+def _phi_value(rng, phi_type, first, last):
+    if phi_type == "patient_name":
+        return f"Patient: {first} {last}"
+    if phi_type == "doctor_name":
+        return f"Dr. {rng.choice(LAST_NAMES)}"
+    if phi_type == "ssn":
+        return f"{rng.randint(100, 899):03d}-{rng.randint(1, 99):02d}-{rng.randint(1, 9999):04d}"
+    if phi_type == "phone":
+        return f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+    if phi_type == "email":
+        return f"{first.lower()}.{last.lower()}{rng.randint(1, 99)}@{rng.choice(EMAIL_DOMAINS)}"
+    if phi_type == "date":
+        return f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/{rng.randint(2015, 2025)}"
+    if phi_type == "medical_record":
+        return f"MRN: {rng.randint(100000, 9999999)}"
+    if phi_type == "address":
+        city, state = rng.choice(CITIES)
+        return f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {city}, {state} {rng.randint(10000, 99999)}"
+    if phi_type == "name_standalone":
+        return f"{rng.choice(['Mr.', 'Ms.', 'Mrs.'])} {first} {last}"
+    raise ValueError(f"Unknown PHI type: {phi_type}")
+
+# Sentence templates for each PHI type; "{}" is replaced by the PHI value
+PHI_SENTENCES = {
+    "patient_name": "{}.",
+    "doctor_name": "Seen by {} in clinic.",
+    "ssn": "SSN {} on file.",
+    "phone": "Contact phone {}.",
+    "email": "Email {} for follow-up.",
+    "date": "Visit on {}.",
+    "medical_record": "{}.",
+    "address": "Lives at {}.",
+    "name_standalone": "{} was accompanied by family.",
+}
+
+def generate_record(rng, phi_rate=0.5, urgency_weights=(0.15, 0.35, 0.5)):
+    """Generate one synthetic clinical note.
+    
+    Returns a dict with the raw ``text`` (including PHI), store ``metadata``
+    (diagnosis, urgency, category, medications) and the ``phi`` values embedded
+    in the text, keyed by PHIMasker entity type.
+    """
+    urgency = rng.choices(URGENCY_LEVELS, weights=urgency_weights)[0]
+    diagnosis, symptoms = rng.choice(CONDITIONS[urgency])
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    
+    # Patient name always leads the note; other identifiers are sprinkled in
+    phi_types = ["patient_name"] + [t for t in PHI_TYPES[1:] if rng.random() < phi_rate]
+    phi = {phi_type: _phi_value(rng, phi_type, first, last) for phi_type in phi_types}
+    
+    if urgency == "low":
+        presenting = rng.sample(symptoms, k=rng.randint(1, len(symptoms)))
+    else:
+        presenting = [symptoms[0]] + rng.sample(symptoms[1:], k=rng.randint(0, len(symptoms) - 1))
+    medications = rng.sample(MEDICATIONS, k=rng.randint(0, 3))
+    sentences = [PHI_SENTENCES["patient_name"].format(phi["patient_name"])]
+    sentences.append(f"Presents with {' and '.join(presenting)} for {rng.randint(1, 14)} days.")
+    sentences.extend(PHI_SENTENCES[t].format(phi[t]) for t in phi_types[1:])
+    if medications:
+        sentences.append(f"Current medications: {', '.join(medications)}.")
+    sentences.append(f"Assessment consistent with {diagnosis.lower()}.")
+    
+    return {
+        "text": " ".join(sentences),
+        "metadata": {
+            "diagnosis": diagnosis,
+            "urgency": urgency,
+            "category": "synthetic",
+            "medications": ", ".join(medications) or "None",
+        },
+        "phi": phi,
+    }
+
+def reuse_template(rng, record):
+    """A note written from the same template as ``record`` for a different patient.
+    
+    Only the PHI values change, so once masked the two notes are identical; this
+    is what templated notes and copy-forward visit notes look like to the store.
+    """
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    text = record["text"]
+    phi = {}
+    for phi_type, value in record["phi"].items():
+        phi[phi_type] = _phi_value(rng, phi_type, first, last)
+        text = text.replace(value, phi[phi_type], 1)
+    return {"text": text, "metadata": dict(record["metadata"]), "phi": phi}
+
+def _generate_records(rng, phi_rate, repeat_rate):
+    recent = deque(maxlen=1000)
+    while True:
+        if repeat_rate and recent and rng.random() < repeat_rate:
+            yield reuse_template(rng, rng.choice(recent))
+            continue
+        record = generate_record(rng, phi_rate)
+        recent.append(record)
+        yield record
+
+def iter_records(count=None, seed=0, phi_rate=0.5, repeat_rate=0.0):
+    """Yield ``count`` synthetic records (endless if None), reproducible for a given seed.
+    
+    ``repeat_rate`` is the fraction of records that reuse the template of a recent one.
+    """
+    records = _generate_records(random.Random(seed), phi_rate, repeat_rate)
+    return records if count is None else islice(records, count)
+
+def generate_corpus(count, seed=0, phi_rate=0.5, repeat_rate=0.0):
+    """List of ``count`` synthetic records. Use iter_records for large corpora."""
+    return list(iter_records(count, seed, phi_rate, repeat_rate))
+
+def sample_queries(count, seed=0):
+    """Symptom queries like the ones clinicians type into the symptom checker"""
+    rng = random.Random(seed)
+    all_symptoms = [s for conditions in CONDITIONS.values() for _, symptoms in conditions for s in symptoms]
+    return [" and ".join(rng.sample(all_symptoms, k=rng.randint(1, 3))) for _ in range(count)]
+
+def test_synthetic_data():
+    """Test the synthetic corpus generator"""
+    print("🧪 Testing Synthetic Clinical Data Generator...")
+    
+    corpus = generate_corpus(5, seed=42)
+    for i, record in enumerate(corpus, 1):
+        print(f"\n--- Record {i} ---")
+        print(f"📝 Text: {record['text']}")
+        print(f"🏷️ Metadata: {record['metadata']}")
+        print(f"🔒 PHI types: {', '.join(record['phi'])}")
+    
+    if generate_corpus(5, seed=42) == corpus:
+        print("\n✅ Generator is reproducible for a fixed seed")
+    else:
+        print("\n❌ Generator is not reproducible")
+
+if __name__ == "__main__":
+    test_synthetic_data()
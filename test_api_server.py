@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+from api_server import MedSecureAPI
+from mock_database import MockMedicalVectorDB
+from phi_masking import PHIMasker
+
+async def _call(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    data = await reader.readexactly(int(headers["content-length"]))
+    return status, headers, data
+
+def _with_server(scenario, db_kwargs=None, **api_kwargs):
+    async def run():
+        api = MedSecureAPI(PHIMasker(), None, MockMedicalVectorDB(**(db_kwargs or {})), **api_kwargs)
+        server = await asyncio.start_server(api.handle_connection, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        try:
+            return await scenario(reader, writer, api)
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            api.close()
+    return asyncio.run(run())
+
+def test_ingest_and_search_over_one_keep_alive_connection():
+    """Bulk ingest masks PHI and triages; search finds the record on the same connection"""
+    async def scenario(reader, writer, api):
+        status, headers, data = await _call(reader, writer, "POST", "/records", {"records": [
+            {"text": "Patient: John Smith has chest pain, phone (123) 456-7890",
+             "metadata": {"diagnosis": "Cardiac", "original_text": "raw PHI"}},
+            {"text": "Mild cough for two days", "metadata": {"urgency": "low"}},
+        ]})
+        assert status == 200 and headers["connection"] == "keep-alive"
+        assert json.loads(data)["stored"] == 2
+        
+        status, _, data = await _call(reader, writer, "POST", "/search", {"query": "chest pain", "top_k": 3})
+        result = json.loads(data)
+        assert status == 200
+        assert result["triage"]["color"] == "red"
+        assert len(result["results"]) == 1
+        hit = result["results"][0]
+        assert "John Smith" not in hit["text"] and "456-7890" not in hit["text"]
+        assert hit["metadata"]["urgency"] == "high"
+        assert "original_text" not in hit["metadata"]
+    _with_server(scenario)
+
+def test_bulk_ingest_reports_skipped_duplicates():
+    """With dedup skip, near-duplicates are listed with their canonical ID and not counted as stored"""
+    async def scenario(reader, writer, api):
+        note = "Patient: John Smith has a cough and sore throat for 3 days"
+        status, _, data = await _call(reader, writer, "POST", "/records", {"records": [
+            {"text": note}, {"text": "Mild back pain after lifting boxes"}, {"text": note.replace("John", "Jane")},
+        ]})
+        result = json.loads(data)
+        assert status == 200
+        assert result["stored"] == 2
+        assert result["duplicates"] == [[2, result["ids"][0]]]
+        assert len(set(result["ids"])) == 2
+    _with_server(scenario, db_kwargs={"dedup": "skip"})
+
+def test_mask_and_error_responses():
+    """Masking works for single and batched texts; bad requests get 4xx, no embedder gives 503"""
+    async def scenario(reader, writer, api):
+        status, _, data = await _call(reader, writer, "POST", "/mask", {"texts": ["SSN 123-45-6789", "fine"]})
+        assert status == 200
+        assert json.loads(data)["masked"] == ["SSN [ssn_REDACTED]", "fine"]
+        
+        assert (await _call(reader, writer, "POST", "/search", {"query": ""}))[0] == 400
+        assert (await _call(reader, writer, "GET", "/mask"))[0] == 405
+        assert (await _call(reader, writer, "GET", "/nope"))[0] == 404
+        assert (await _call(reader, writer, "POST", "/embed", {"text": "x"}))[0] == 503
+        
+        status, headers, data = await _call(reader, writer, "GET", "/metrics")
+        assert status == 200 and headers["content-type"].startswith("text/plain")
+        assert b"medsecure_stage_latency_seconds_bucket" in data
+    _with_server(scenario)
+
+def test_malformed_framing_gets_a_response():
+    """A negative Content-Length or an oversized request line is answered, not dropped"""
+    def status_for(request):
+        async def scenario(reader, writer, api):
+            writer.write(request)
+            await writer.drain()
+            return int((await reader.readline()).split()[1])
+        return _with_server(scenario)
+    
+    assert status_for(b"POST /mask HTTP/1.1\r\nHost: test\r\nContent-Length: -5\r\n\r\n") == 400
+    assert status_for(b"GET /" + b"a" * 100_000 + b" HTTP/1.1\r\n\r\n") == 414
+
+def test_load_shedding_when_saturated():
+    """Past max_in_flight the server answers 503 with Retry-After instead of queueing"""
+    async def scenario(reader, writer, api):
+        status, headers, _ = await _call(reader, writer, "POST", "/mask", {"text": "hello"})
+        assert status == 503
+        assert headers["retry-after"] == "1"
+        assert (await _call(reader, writer, "GET", "/metrics"))[0] == 200
+    _with_server(scenario, max_in_flight=0)
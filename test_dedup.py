@@ -0,0 +1,38 @@
+from dedup import NearDuplicateIndex
+
+NOTE = ("[patient_name_REDACTED]. Presents with chest pain and shortness of breath for 2 days. "
+        "Seen by [doctor_name_REDACTED] in clinic. Current medications: aspirin, lisinopril. "
+        "Assessment consistent with cardiac.")
+
+def test_finds_copies_and_ignores_unrelated_notes():
+    """Identical notes match with similarity 1; different notes don't match at all"""
+    index = NearDuplicateIndex(threshold=0.85)
+    index.add("a", index.signature(NOTE))
+    
+    assert index.query(index.signature(NOTE)) == ("a", 1.0)
+    assert index.query(index.signature(NOTE.replace("[doctor_name_REDACTED]", "[doctor_name_REDACTED]  "))) == ("a", 1.0)
+    assert index.query(index.signature("Cough and sore throat for three days, afebrile, lungs clear.")) is None
+    assert index.signature("...") is None
+    assert index.query(None) is None
+
+def test_remove_and_reuse_rows_across_merges():
+    """Removed keys stop matching, also after pending buckets are merged into the sorted array"""
+    index = NearDuplicateIndex(threshold=0.85)
+    index.MERGE_MIN_ENTRIES = 64
+    notes = [f"Visit {i}: patient number {i} reports symptom {i} and takes drug {i} daily for {i} weeks"
+             for i in range(100)]
+    for i, note in enumerate(notes):
+        index.add(i, index.signature(note))
+    assert len(index._bucket_hashes)  # at least one merge happened
+    
+    for i in range(0, 100, 2):
+        assert index.remove(i)
+    assert not index.remove(0)
+    for i in range(0, 20, 2):
+        index.add(i + 100, index.signature(notes[i]))
+    
+    assert len(index) == 60
+    for i, note in enumerate(notes):
+        match = index.query(index.signature(note))
+        expected = i + 100 if i < 20 and i % 2 == 0 else (None if i % 2 == 0 else i)
+        assert (match and match[0]) == expected, (i, match)
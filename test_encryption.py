@@ -0,0 +1,77 @@
+import random
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from encryption import KEY_ENV_VAR, EncryptedArena, load_key
+
+def _filled_arena(block_size=256, cache_blocks=3, count=200, seed=0):
+    """An encrypted arena and a plain bytearray holding the same appends"""
+    rng = random.Random(seed)
+    arena, plain, spans = EncryptedArena(load_key(), block_size, cache_blocks), bytearray(), []
+    for i in range(count):
+        chunk = f"note {i}: ".encode() + bytes(rng.randrange(97, 123) for _ in range(rng.randint(0, 300)))
+        spans.append((len(plain), len(plain) + len(chunk)))
+        arena += chunk
+        plain += chunk
+    return arena, plain, spans
+
+def test_slices_match_plaintext_across_block_boundaries():
+    """Any slice reads back exactly, including records spanning several blocks"""
+    arena, plain, spans = _filled_arena()
+    
+    assert len(arena) == len(plain)
+    assert arena.stats()['sealed_blocks'] == len(plain) // 256
+    for start, stop in spans:
+        assert arena[start:stop] == plain[start:stop]
+    assert arena[0:len(plain)] == bytes(plain)
+    assert arena[10:10] == b""
+    base, block = arena.block_at(300)
+    assert base == 256 and block == plain[256:512]
+    
+    # Reading everything never holds more decrypted blocks than the cache allows
+    assert arena.stats()['cached_blocks'] <= 3
+
+def test_nothing_is_plaintext_at_rest_before_reads():
+    """Even the partly filled last block is sealed, and writes don't fill the read cache"""
+    arena = EncryptedArena(load_key(), block_size=4096)
+    arena += b"note 1: chest pain radiating to the left arm"
+    arena += b"note 2: chest pain with sweating"
+    stats = arena.stats()
+    assert stats['sealed_blocks'] == 0 and stats['tail_chunks'] == 2
+    assert not any(b"chest" in chunk for chunk in arena._tail[3])
+    assert arena[8:18] == b"chest pain"
+    
+    arena, plain, _ = _filled_arena()
+    assert arena.stats()['cached_blocks'] == 0 and arena.stats()['cache_bytes'] == 0
+    assert not any(b"note " in chunk for chunk in arena._tail[3])
+
+def test_sealed_blocks_are_ciphertext_and_authenticated():
+    """Stored blocks don't leak plaintext, and tampering or reordering is detected"""
+    arena, plain, _ = _filled_arena(cache_blocks=1)
+    assert not any(b"note " in block for block in arena._blocks)
+    
+    arena._cache.clear()
+    arena._last = (-1, b"")
+    arena._blocks[0], arena._blocks[1] = arena._blocks[1], arena._blocks[0]
+    with pytest.raises(InvalidTag):
+        arena[0:10]
+    
+    arena._blocks[1] = arena._blocks[1][:-1] + bytes([arena._blocks[1][-1] ^ 1])
+    with pytest.raises(InvalidTag):
+        arena[300:310]
+    
+    tail_start, _, _, chunks = arena._tail
+    chunks[0] = chunks[0][:-1] + bytes([chunks[0][-1] ^ 1])
+    with pytest.raises(InvalidTag):
+        arena[tail_start:tail_start + 1]
+
+def test_load_key(monkeypatch):
+    """Keys come from the argument, then the environment, then are generated"""
+    monkeypatch.delenv(KEY_ENV_VAR, raising=False)
+    assert len(load_key()) == 32
+    assert load_key(b"k" * 16) == b"k" * 16
+    monkeypatch.setenv(KEY_ENV_VAR, "00" * 24)
+    assert load_key() == bytes(24)
+    with pytest.raises(ValueError):
+        load_key(b"short")
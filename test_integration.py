@@ -1,5 +1,6 @@
 from phi_masking import PHIMasker
 from embeddings import MedicalEmbedder
+from synthetic_data import generate_corpus
 
 def test_phi_and_embeddings():
     """Test that PHI masking and embeddings work together"""
@@ -10,11 +11,7 @@ def test_phi_and_embeddings():
     embedder = MedicalEmbedder()
     
     # Test medical text with PHI
-    test_cases = [
-        "Patient John Smith presents with headache and fever, phone (123) 456-7890",
-        "Dr. Johnson diagnosed hypertension in patient Sarah Wilson on 12/25/2023",
-        "Simple case: cough and sore throat for 3 days"
-    ]
+    test_cases = [record["text"] for record in generate_corpus(3, seed=0)]
     
     for i, text in enumerate(test_cases, 1):
         print(f"\n--- Integration Test {i} ---")
@@ -0,0 +1,68 @@
+import pytest
+
+from metrics import Histogram, MetricsRegistry
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    """Quantiles land inside the bucket that holds them"""
+    histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+    for _ in range(90):
+        histogram.observe(0.0005)
+    for _ in range(10):
+        histogram.observe(0.05)
+    
+    assert histogram.count == 100
+    assert 0 < histogram.quantile(0.5) <= 0.001
+    assert 0.01 < histogram.quantile(0.99) <= 0.1
+    assert histogram.summary()['count'] == 100
+
+def test_span_records_latency_and_errors():
+    """Spans time every call and count the ones that raise"""
+    registry = MetricsRegistry()
+    
+    @registry.timed("stage")
+    def work(fail=False):
+        if fail:
+            raise ValueError("boom")
+        return 42
+    
+    assert work() == 42
+    with pytest.raises(ValueError):
+        work(fail=True)
+    
+    snapshot = registry.snapshot()
+    assert snapshot['stages']['stage']['count'] == 2
+    assert snapshot['counters'] == {'stage_errors_total{stage="stage"}': 1}
+
+def test_prometheus_export_format():
+    """Export follows the Prometheus text format: cumulative buckets, sum, count, gauges"""
+    registry = MetricsRegistry(namespace="test")
+    registry.observe("mask_phi", 0.002)
+    registry.observe("mask_phi", 20.0)
+    registry.increment("records_stored_total", 5)
+    registry.register_gauge("store_bytes", lambda: 2048, "Bytes in the store.")
+    registry.register_gauge("broken", lambda: 1 / 0)
+    
+    text = registry.export_prometheus()
+    assert "# TYPE test_stage_latency_seconds histogram" in text
+    assert 'test_stage_latency_seconds_bucket{stage="mask_phi",le="0.0025"} 1' in text
+    assert 'test_stage_latency_seconds_bucket{stage="mask_phi",le="10"} 1' in text
+    assert 'test_stage_latency_seconds_bucket{stage="mask_phi",le="+Inf"} 2' in text
+    assert 'test_stage_latency_seconds_count{stage="mask_phi"} 2' in text
+    assert "test_records_stored_total 5" in text
+    assert "test_store_bytes 2048" in text
+    assert "broken" not in text
+    assert text.endswith("\n")
+
+def test_sampled_profiling_collects_stats():
+    """With a sample rate of 1 every span is profiled and memory is tracked"""
+    registry = MetricsRegistry()
+    registry.enable_profiling(sample_rate=1.0, trace_memory=True)
+    try:
+        with registry.span("alloc"):
+            data = [str(i) for i in range(1000)]
+    finally:
+        registry.disable_profiling()
+    
+    assert len(data) == 1000
+    assert "function calls" in registry.profile_report()
+    assert registry.snapshot()['counters']['stage_allocated_bytes_total{stage="alloc"}'] > 0
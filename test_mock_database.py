@@ -0,0 +1,313 @@
+import threading
+import time
+
+from mock_database import MockMedicalVectorDB
+
+def _make_db(count=3, **kwargs):
+    db = MockMedicalVectorDB(**kwargs)
+    ids = [db.store_medical_record(f"Patient {i} with headache and fever", {"urgency": "low"})
+           for i in range(count)]
+    return db, ids
+
+def test_delete_hides_record_from_search():
+    """Deleted records are skipped by search and listings"""
+    db, ids = _make_db()
+    
+    assert db.delete_medical_record(ids[0])
+    assert not db.delete_medical_record(ids[0])
+    assert ids[0] not in db.get_all_records()
+    assert db.get_collection_info()['total_records'] == 2
+    assert len(db.search_similar_cases("headache", top_k=5)['documents'][0]) == 2
+
+def test_update_replaces_text_and_keeps_id():
+    """Updates keep the record ID and only the new version is searchable"""
+    db, ids = _make_db()
+    added = db.get_all_records()[ids[1]]['timestamp']
+    
+    assert db.update_medical_record(ids[1], "Chest pain radiating to left arm", {"urgency": "high"})
+    record = db.get_all_records()[ids[1]]
+    assert record['text'] == "Chest pain radiating to left arm"
+    assert record['urgency'] == "high"
+    assert record['timestamp'] == added
+    assert db.get_collection_info()['total_records'] == 3
+    
+    results = db.search_similar_cases("chest", top_k=5)
+    assert results['documents'][0] == ["Chest pain radiating to left arm"]
+    assert not db.update_medical_record("missing-id", "text")
+
+def test_compaction_drops_tombstones():
+    """Compaction rewrites live records densely and reports reclaimed memory"""
+    db, ids = _make_db(10)
+    for record_id in ids[:6]:
+        db.delete_medical_record(record_id)
+    db.update_medical_record(ids[6], "Updated note")
+    
+    stats = db.compact()
+    assert stats['removed_records'] == 7
+    assert stats['live_records'] == 4
+    assert stats['reclaimed_bytes'] > 0
+    assert db.tombstone_ratio() == 0.0
+    assert set(db.get_all_records()) == set(ids[6:])
+    assert db.get_all_records()[ids[6]]['text'] == "Updated note"
+
+def test_background_compaction_past_threshold():
+    """Crossing the tombstone threshold triggers a background compaction"""
+    db, ids = _make_db(MockMedicalVectorDB.COMPACTION_MIN_RECORDS, compaction_threshold=0.5)
+    for record_id in ids[:len(ids) // 2]:
+        db.delete_medical_record(record_id)
+    db.wait_for_compaction(timeout=10)
+    
+    info = db.get_collection_info()
+    assert info['last_compaction'] is not None
+    assert info['deleted_records'] == 0
+    assert info['total_records'] == len(ids) // 2
+
+def test_manual_compaction_waits_for_background_compaction():
+    """A manual compaction overlapping a background one loses no records written in between"""
+    db, ids = _make_db(MockMedicalVectorDB.COMPACTION_MIN_RECORDS)
+    for record_id in ids[:10]:
+        db.delete_medical_record(record_id)
+    
+    # Hold the background compaction in its copy phase
+    copying, release = threading.Event(), threading.Event()
+    columns = db._columns
+    empty_like = columns.empty_like
+    def paused_empty_like():
+        if not copying.is_set():
+            copying.set()
+            release.wait(10)
+        return empty_like()
+    columns.empty_like = paused_empty_like
+    background = threading.Thread(target=db.compact)
+    background.start()
+    assert copying.wait(10)
+    
+    manual = threading.Thread(target=db.compact)
+    manual.start()
+    time.sleep(0.2)
+    new_id = db.store_medical_record("Patient with sprained ankle", {"urgency": "low"})
+    release.set()
+    background.join(10)
+    manual.join(10)
+    
+    records = db.get_all_records()
+    assert new_id in records
+    assert set(records) == set(ids[10:]) | {new_id}
+    assert db.tombstone_ratio() == 0.0
+
+def test_records_page_cursor_walks_all_records():
+    """Paging with cursors returns every live record exactly once, in timestamp order"""
+    db, ids = _make_db(7)
+    db.delete_medical_record(ids[3])
+    
+    seen, cursor = [], None
+    while True:
+        page = db.get_records_page(cursor, limit=2)
+        assert len(page['records']) <= 2
+        seen.extend(record['id'] for record in page['records'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == ids[:3] + ids[4:]
+    
+    newest_first = [record['id'] for record in db.iter_records(page_size=3, order="desc")]
+    assert newest_first == list(reversed(seen))
+
+def test_records_page_order_follows_timestamp_across_updates():
+    """A corrected record keeps its place, also when it is updated between page fetches"""
+    db, ids = _make_db(2)
+    db.update_medical_record(ids[0], "Corrected note")
+    assert [record['id'] for record in db.get_records_list()] == ids
+    assert [record['id'] for record in db.iter_records(order="desc")] == ids[::-1]
+    
+    for order in ("asc", "desc"):
+        db, ids = _make_db(5)
+        expected = ids if order == "asc" else ids[::-1]
+        page = db.get_records_page(limit=2, order=order)
+        seen = [record['id'] for record in page['records']]
+        # Correct one record already shown and one still to come
+        db.update_medical_record(expected[0], "Corrected first note")
+        db.update_medical_record(expected[-1], "Corrected last note")
+        cursor = page['next_cursor']
+        while cursor is not None:
+            page = db.get_records_page(cursor, limit=2, order=order)
+            seen.extend(record['id'] for record in page['records'])
+            cursor = page['next_cursor']
+            if order == "desc":
+                db.compact()   # and cursors still hold across compaction
+        assert seen == expected, order
+        timestamps = [record['timestamp'] for record in db.iter_records(order=order)]
+        assert timestamps == sorted(timestamps, reverse=order == "desc")
+
+def test_records_page_cursor_survives_compaction_and_projects_fields():
+    """Cursors stay valid across compaction; fields limits the returned keys"""
+    db, ids = _make_db(6)
+    page = db.get_records_page(limit=3, fields=['urgency'])
+    assert page['records'][0] == {'id': ids[0], 'urgency': 'low'}
+    
+    db.delete_medical_record(ids[1])
+    db.compact()
+    rest = db.get_records_page(page['next_cursor'], limit=10)
+    assert [record['id'] for record in rest['records']] == ids[3:]
+    assert rest['next_cursor'] is None
+
+def test_get_all_records_returns_copy():
+    """Mutating the returned records does not touch the store"""
+    db, ids = _make_db(1)
+    db.get_all_records()[ids[0]]['text'] = "tampered"
+    assert db.get_all_records()[ids[0]]['text'] != "tampered"
+
+def test_columnar_round_trip_preserves_metadata():
+    """Categorical, extra and unhashable metadata come back exactly as stored"""
+    db = MockMedicalVectorDB()
+    metadata = {"diagnosis": "Cardiac", "urgency": "high", "category": "custom",
+                "medications": ["aspirin", "warfarin"], "notes": "ünïcode ✓"}
+    record_id = db.store_medical_record("Chest pain 🫀 and sweating", metadata)
+    bare_id = db.store_medical_record("No metadata at all")
+    
+    records = db.get_all_records()
+    stored = records[record_id]
+    assert stored['text'] == "Chest pain 🫀 and sweating"
+    assert {key: stored[key] for key in metadata} == metadata
+    assert stored['phi_removed'] is True
+    assert 'diagnosis' not in records[bare_id]
+    
+    results = db.search_similar_cases("chest", top_k=1)
+    assert results['metadatas'][0][0]['medications'] == ["aspirin", "warfarin"]
+    assert 'text' not in results['metadatas'][0][0]
+    assert db.get_records_page(limit=2)['records'][1]['diagnosis'] == 'N/A'
+
+def test_concurrent_readers_and_writers():
+    """Searches and page reads never fail while other threads write, delete and compact"""
+    db, ids = _make_db(200, compaction_threshold=0.1)
+    errors = []
+    stop = threading.Event()
+    
+    def reader():
+        try:
+            while not stop.is_set():
+                db.search_similar_cases("headache", top_k=5)
+                list(db.iter_records(page_size=50))
+                db.get_collection_info()
+        except Exception as e:  # pragma: no cover - only reached on failure
+            errors.append(e)
+    
+    def writer(worker):
+        try:
+            for i in range(150):
+                record_id = db.store_medical_record(f"Writer {worker} note {i} with fever")
+                if i % 3 == 0:
+                    db.update_medical_record(record_id, f"Writer {worker} corrected note {i}")
+                if i % 2 == 0:
+                    db.delete_medical_record(record_id)
+        except Exception as e:  # pragma: no cover - only reached on failure
+            errors.append(e)
+    
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    writers = [threading.Thread(target=writer, args=(worker,)) for worker in range(3)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    db.wait_for_compaction()
+    
+    assert errors == []
+    assert db.get_collection_info()['total_records'] == 200 + 3 * 75
+    assert len(db.get_records_list()) == 200 + 3 * 75
+
+def test_dedup_skip_returns_canonical_id():
+    """In skip mode a near-duplicate isn't stored and its canonical ID comes back"""
+    db = MockMedicalVectorDB(dedup="skip")
+    first = db.store_medical_record("[patient_name_REDACTED]. Presents with cough and sore throat for 3 days.")
+    again = db.store_medical_record("[patient_name_REDACTED]. Presents with cough and sore throat for 3 days.")
+    other = db.store_medical_record("Chest pain radiating to the left arm with sweating")
+    
+    assert again == first and other != first
+    info = db.get_collection_info()
+    assert info['total_records'] == 2
+    assert info['duplicates_detected'] == 1
+    assert info['dedup_ratio'] == round(1 / 3, 4)
+    
+    # Once the canonical record is gone the same text is stored again
+    db.delete_medical_record(first)
+    assert db.store_medical_record("[patient_name_REDACTED]. Presents with cough and sore throat for 3 days.") != first
+
+def test_dedup_link_hides_copies_from_search_until_canonical_deleted():
+    """Linked near-duplicates are stored but only their canonical record is searchable"""
+    db = MockMedicalVectorDB(dedup="link")
+    text = "[patient_name_REDACTED]. Presents with severe headache and nausea for 2 days."
+    canonical = db.store_medical_record(text, {"urgency": "medium"})
+    copies = [db.store_medical_record(text, {"urgency": "medium"}) for _ in range(3)]
+    
+    records = db.get_all_records()
+    assert len(records) == 4
+    assert all(records[copy]['duplicate_of'] == canonical for copy in copies)
+    assert 'duplicate_of' not in records[canonical]
+    assert len(db.search_similar_cases("headache", top_k=5)['documents'][0]) == 1
+    
+    db.delete_medical_record(canonical)
+    assert len(db.search_similar_cases("headache", top_k=5)['documents'][0]) == 3
+
+def test_dedup_link_follows_corrected_text():
+    """Correcting a linked copy or its canonical record re-runs near-duplicate detection"""
+    db = MockMedicalVectorDB(dedup="link")
+    chest = "[patient_name_REDACTED]. Presents with chest pain and sweating for 2 days."
+    canonical = db.store_medical_record(chest)
+    copies = [db.store_medical_record(chest) for _ in range(3)]
+    
+    # A copy corrected to unrelated text is no longer linked and shows up in search
+    assert db.update_medical_record(copies[0], "Fractured left wrist after a fall while skiing.")
+    assert 'duplicate_of' not in db.get_all_records()[copies[0]]
+    assert len(db.search_similar_cases("wrist skiing", top_k=5)['documents'][0]) == 1
+    
+    # Correcting the canonical record releases the remaining copies of its old text
+    assert db.update_medical_record(canonical, "Mild seasonal allergies with sneezing and itchy eyes.")
+    assert len(db.search_similar_cases("chest pain", top_k=5)['documents'][0]) == 2
+    assert len(db.search_similar_cases("sneezing", top_k=5)['documents'][0]) == 1
+    
+    # A correction that duplicates another record gets linked to it
+    assert db.update_medical_record(copies[1], "Fractured left wrist after a fall while skiing.")
+    assert db.get_all_records()[copies[1]]['duplicate_of'] == copies[0]
+
+def test_caller_cannot_set_duplicate_of():
+    """duplicate_of is owned by the store, so callers can't hide a unique record"""
+    db = MockMedicalVectorDB(dedup="link")
+    other = db.store_medical_record("Chest pain radiating to the left arm")
+    record_id = db.store_medical_record("Passing kidney stones with flank pain", {"duplicate_of": other})
+    assert 'duplicate_of' not in db.get_all_records()[record_id]
+    assert len(db.search_similar_cases("kidney stones", top_k=5)['documents'][0]) == 1
+    
+    db.update_medical_record(record_id, metadata={"duplicate_of": other})
+    assert len(db.search_similar_cases("kidney stones", top_k=5)['documents'][0]) == 1
+
+def test_encrypted_store_matches_plaintext_store():
+    """Encryption at rest changes neither search results nor records, also after compaction"""
+    texts = [f"Patient {i} reports {'chest pain' if i % 3 else 'headache'} for {i % 9} days. "
+             f"Follow-up notes: {'stable ' * (i % 60)}" for i in range(800)]
+    plain = MockMedicalVectorDB(encrypt=False)
+    encrypted = MockMedicalVectorDB(decrypted_cache_blocks=1)
+    for db in (plain, encrypted):
+        for i, text in enumerate(texts):
+            db.store_medical_record(text, {"urgency": "low", "note_number": i})
+    
+    info = encrypted.get_collection_info()
+    assert info['encrypted'] and not plain.get_collection_info()['encrypted']
+    assert info['encryption']['sealed_blocks'] >= 2
+    assert not any(b"Patient" in block for block in encrypted._columns.arena._blocks)
+    
+    def contents(db):
+        return sorted((record['text'], record['note_number']) for record in db.get_all_records().values())
+    
+    for query in ("chest pain", "headache stable"):
+        assert (encrypted.search_similar_cases(query, top_k=10)['documents']
+                == plain.search_similar_cases(query, top_k=10)['documents'])
+    
+    for db in (plain, encrypted):
+        for record_id in list(db.get_all_records())[::2]:
+            db.delete_medical_record(record_id)
+        db.wait_for_compaction()
+        db.compact()
+    assert contents(encrypted) == contents(plain)
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from sharded_search import ShardedVectorIndex
+
+def test_sharded_search_matches_brute_force():
+    """Merged shard results equal a single-process cosine top-k"""
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((2_001, 32)).astype(np.float32)
+    queries = rng.standard_normal((3, 32)).astype(np.float32)
+    labels = [f"record-{i}" for i in range(len(vectors))]
+    
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+    expected = np.argsort(-scores, axis=1)[:, :4]
+    
+    with ShardedVectorIndex.from_vectors(vectors, labels=labels, workers=3) as index:
+        assert index.num_workers == 3
+        results = index.search_batch(queries, top_k=4)
+        single = index.search(queries[0], top_k=4)
+    
+    for row, result in zip(expected, results):
+        assert [label for label, _ in result] == [labels[i] for i in row]
+    assert [label for label, _ in single] == [label for label, _ in results[0]]
+    assert abs(results[0][0][1] - scores[0, expected[0, 0]]) < 1e-5
+
+def test_sharded_search_top_k_larger_than_corpus():
+    """Asking for more results than vectors returns every vector once"""
+    vectors = np.eye(3, dtype=np.float32)
+    with ShardedVectorIndex.from_vectors(vectors, workers=2) as index:
+        result = index.search([1.0, 0.0, 0.0], top_k=10)
+    assert sorted(label for label, _ in result) == [0, 1, 2]
+    assert result[0][0] == 0 and abs(result[0][1] - 1.0) < 1e-6
+
+def test_sharded_search_from_many_threads():
+    """Concurrent callers each get the results for their own query"""
+    rng = np.random.default_rng(2)
+    vectors = rng.standard_normal((500, 16)).astype(np.float32)
+    with ShardedVectorIndex.from_vectors(vectors, workers=2) as index:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda row: index.search(vectors[row], top_k=1), range(200)))
+    assert [result[0][0] for result in results] == list(range(200))
@@ -0,0 +1,43 @@
+from collections import Counter
+
+from phi_masking import PHIMasker
+from synthetic_data import PHI_TYPES, URGENCY_LEVELS, generate_corpus, iter_records, sample_queries
+from triage import TRIAGE_URGENCY, emergency_triage
+
+def test_generator_is_reproducible():
+    """The same seed always produces the same corpus"""
+    assert generate_corpus(20, seed=7) == generate_corpus(20, seed=7)
+    assert generate_corpus(20, seed=7) != generate_corpus(20, seed=8)
+    assert sample_queries(5, seed=1) == sample_queries(5, seed=1)
+
+def test_corpus_covers_every_phi_type_and_urgency():
+    """A modest corpus contains every PHI type PHIMasker targets and every urgency level"""
+    records = generate_corpus(200, seed=0)
+    phi_counts = Counter(phi_type for record in records for phi_type in record["phi"])
+    assert set(phi_counts) == set(PHI_TYPES)
+    assert {record["metadata"]["urgency"] for record in records} == set(URGENCY_LEVELS)
+    for record in records:
+        for value in record["phi"].values():
+            assert value in record["text"]
+
+def test_urgency_metadata_agrees_with_triage():
+    """Triage of every generated note gives the urgency stored in its metadata"""
+    for record in iter_records(2000, seed=11):
+        triaged = TRIAGE_URGENCY[emergency_triage(record["text"])["color"]]
+        assert triaged == record["metadata"]["urgency"], record["text"]
+
+def test_masker_removes_all_generated_phi():
+    """Every embedded identifier is caught by PHIMasker"""
+    masker = PHIMasker()
+    for record in iter_records(300, seed=3, phi_rate=1.0):
+        masked = masker.mask_phi(record["text"])
+        for phi_type, value in record["phi"].items():
+            assert value not in masked, (phi_type, masked)
+
+def test_repeat_rate_reuses_templates():
+    """Templated records only differ in PHI, so they mask to an earlier record's text"""
+    masker = PHIMasker()
+    records = generate_corpus(300, seed=5, phi_rate=1.0, repeat_rate=0.3)
+    masked = [masker.mask_phi(record["text"]) for record in records]
+    repeats = sum(1 for i, text in enumerate(masked) if text in masked[:i])
+    assert 50 <= repeats <= 130
@@ -0,0 +1,45 @@
+# EMERGENCY TRIAGE KEYWORDS
+EMERGENCY_KEYWORDS = [
+    'chest pain', 'shortness of breath', 'severe bleeding', 'unconscious',
+    'stroke', 'heart attack', 'suicidal', 'seizure', 'choking'
+]
+
+URGENT_KEYWORDS = [
+    'high fever', 'head injury', 'abdominal pain', 'severe burn',
+    'broken bone', 'eye injury', 'severe headache'
+]
+
+def emergency_triage(symptoms):
+    """Enhanced emergency triage system"""
+    symptoms_lower = symptoms.lower()
+    
+    # Check for emergency keywords
+    for keyword in EMERGENCY_KEYWORDS:
+        if keyword in symptoms_lower:
+            return {
+                "level": "🚨 EMERGENCY",
+                "color": "red",
+                "action": "CALL 911 IMMEDIATELY - Life-threatening condition suspected",
+                "instructions": "Do not delay. Seek emergency medical care now."
+            }
+    
+    # Check for urgent keywords
+    for keyword in URGENT_KEYWORDS:
+        if keyword in symptoms_lower:
+            return {
+                "level": "⚠️ URGENT",
+                "color": "orange", 
+                "action": "Visit urgent care within 24 hours",
+                "instructions": "Condition requires prompt medical attention."
+            }
+    
+    # Default non-urgent
+    return {
+        "level": "✅ NON-URGENT", 
+        "color": "green",
+        "action": "Schedule with primary care doctor",
+        "instructions": "Monitor symptoms and seek care if they worsen."
+    }
+
+# Store urgency level matching each triage color
+TRIAGE_URGENCY = {"red": "high", "orange": "medium", "green": "low"}